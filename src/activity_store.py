@@ -0,0 +1,77 @@
+import bisect
+import threading
+
+class ActivityStore:
+    def __init__(self, per_user_limit=5):
+        """
+        Time-ordered VIP activity feed that is updated incrementally.
+        Inserts and deletes find their position by binary search (O(log n)), but shifting the
+        sorted list makes each one O(n). The feed is bounded by watchlist size * per_user_limit
+        (a few hundred entries), where that shift is a short memmove and beats a tree structure.
+        :param per_user_limit: Newest activities kept per user
+        """
+        self.per_user_limit = per_user_limit
+        self.cursors = {}        # user -> last seen event id
+        self._keys = []          # sorted (time, seq) keys, oldest first
+        self._items = {}         # (time, seq) -> activity
+        self._by_user = {}       # user -> keys of that user's activities, oldest first
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_cache(cls, activities, cursors, per_user_limit=5):
+        """Rebuild a store from a persisted activity list and cursor map."""
+        store = cls(per_user_limit=per_user_limit)
+        # Insert oldest first so equal timestamps keep their original relative order
+        for activity in reversed(activities):
+            store._insert(activity)
+        store.cursors = dict(cursors)
+        return store
+
+    def add(self, user, activities, cursor):
+        """Merge a user's new activities and advance their cursor."""
+        with self._lock:
+            # Without a cursor the fetch is a full snapshot, so it replaces what we had
+            if user not in self.cursors:
+                for key in self._by_user.pop(user, []):
+                    self._delete(key)
+
+            for activity in sorted(activities, key=lambda x: x['time']):
+                self._insert(activity)
+
+            # Keep only the newest per_user_limit activities for this user
+            keys = self._by_user.get(user, [])
+            while len(keys) > self.per_user_limit:
+                self._delete(keys.pop(0))
+
+            if cursor is not None:
+                self.cursors[user] = cursor
+
+    def remove_user(self, user):
+        """Drop a user's activities and cursor, touching only their own entries."""
+        with self._lock:
+            for key in self._by_user.pop(user, []):
+                self._delete(key)
+            self.cursors.pop(user, None)
+
+    def users(self):
+        with self._lock:
+            return set(self._by_user) | set(self.cursors)
+
+    def to_list(self):
+        """Activities sorted by time descending."""
+        with self._lock:
+            return [self._items[key] for key in reversed(self._keys)]
+
+    def _insert(self, activity):
+        self._seq += 1
+        key = (activity['time'], self._seq)
+        bisect.insort(self._keys, key)
+        self._items[key] = activity
+        bisect.insort(self._by_user.setdefault(activity['user'], []), key)
+
+    def _delete(self, key):
+        index = bisect.bisect_left(self._keys, key)
+        if index < len(self._keys) and self._keys[index] == key:
+            del self._keys[index]
+        self._items.pop(key, None)
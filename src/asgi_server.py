@@ -0,0 +1,269 @@
+import os
+import time
+import asyncio
+import threading
+from quart import Quart, Response, g, render_template, jsonify, request
+from repo_record import RepoRecord
+from web_server import (cache_manager, search_cache, prerendered, write_token, llm_metrics, record_http, LANGUAGE_NAMES,
+                        dashboard_version, trending_version, dashboard_context, rendered_entry,
+                        STREAM_HEADERS, sse_delta, sse_done, hidden_gems_lines)
+from prerender import negotiate
+import metrics
+from github_client import get_client
+from scraper import search_repos_async
+from user_tracker import get_new_user_activities_async
+
+# Async twin of web_server.py. GitHub and LLM calls are awaited on the event
+# loop, so one process serves many dashboard users without a thread per request.
+# Cache reads still use TrendingCache (thread-based single-flight), so they run
+# in a worker thread and only block when a key has to be fetched inline.
+app = Quart(__name__)
+_quart_json_default = app.json.default
+app.json.default = lambda obj: obj.to_dict() if isinstance(obj, RepoRecord) else _quart_json_default(obj)
+
+def prerendered_response(entry, mimetype):
+    status, body, headers = negotiate(entry, request.headers.get('If-None-Match'), request.headers.get('Accept-Encoding'))
+    return Response(body, status=status, headers=headers, mimetype=mimetype)
+
+async def iterate_in_thread(iterator):
+    """
+    Run a blocking generator (LLM/GitHub streams, cache single-flight) on its own thread
+    and yield its items on the event loop, which keeps serving other requests in between.
+    Only that thread touches the generator: when the response is closed early (client went
+    away) the thread closes it as soon as the next() in progress returns.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def put(message):
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+        except RuntimeError:
+            pass # Event loop already closed
+
+    def produce():
+        try:
+            for item in iterator:
+                if stop.is_set():
+                    break
+                put(('item', item))
+            put(('end', None))
+        except Exception as e:
+            put(('error', e))
+        finally:
+            iterator.close()
+
+    threading.Thread(target=produce, name="stream-iterator", daemon=True).start()
+    try:
+        while True:
+            kind, value = await queue.get()
+            if kind == 'end':
+                return
+            if kind == 'error':
+                raise value
+            yield value
+    finally:
+        stop.set()
+
+async def sse_events(chunks):
+    """Async twin of web_server.sse_events() for an async generator of text chunks."""
+    parts = []
+    async for chunk in chunks:
+        parts.append(chunk)
+        yield sse_delta(chunk)
+    yield sse_done(parts)
+
+def sse_response(chunks):
+    """Async twin of web_server.sse_response(); the LLM stream is awaited on the event loop, not in a thread."""
+    return Response(sse_events(chunks), mimetype='text/event-stream', headers=STREAM_HEADERS)
+
+def analyze_stream_chunks(data):
+    """Async twin of web_server.analyze_stream_chunks()."""
+    description = data.get('description') or ''
+    language = data.get('language') or 'Unknown'
+    analyzer = cache_manager.llm_analyzer
+    if data.get('mode') == 'potential':
+        return analyzer.analyze_potential_stream_async(data['name'], description, language)
+    return analyzer.analyze_repo_stream_async(data['name'], description, language)
+
+@app.before_request
+async def start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+async def record_request(response):
+    if 'started' in g:
+        record_http(request.url_rule, request.method, response.status_code, g.started)
+    return response
+
+@app.route('/')
+async def dashboard():
+    version = dashboard_version()
+    trending_data = await asyncio.to_thread(cache_manager.get_data, since='daily')
+    vip_data = await asyncio.to_thread(cache_manager.get_vip_activities)
+
+    entry = prerendered.lookup('dashboard', version)
+    if entry is None:
+        body = await render_template('index.html', **dashboard_context(trending_data, vip_data))
+        # gzip and brotli at their highest levels take tens of milliseconds; keep them off the event loop
+        entry = await asyncio.to_thread(rendered_entry, 'dashboard', version, dashboard_version(), body)
+    return prerendered_response(entry, 'text/html')
+
+@app.route('/api/trending')
+async def get_trending():
+    since = request.args.get('since', 'daily')
+    if since not in ['daily', 'weekly', 'monthly']:
+        since = 'daily'
+
+    version = trending_version(since)
+    trending_data = await asyncio.to_thread(cache_manager.get_data, since=since)
+
+    name = f"trending_{since}"
+    entry = prerendered.lookup(name, version)
+    if entry is None:
+        entry = await asyncio.to_thread(
+            lambda: rendered_entry(name, version, trending_version(since), app.json.dumps(trending_data))
+        )
+    return prerendered_response(entry, 'application/json')
+
+@app.route('/api/follow', methods=['POST'])
+async def follow_user():
+    data = await request.get_json()
+    username = data.get('username')
+
+    if not username:
+        return jsonify({"error": "Username required"}), 400
+
+    watchlist = cache_manager.watchlist
+    if username not in watchlist:
+        watchlist.append(username)
+        cache_manager.save_watchlist(watchlist)
+
+        try:
+            updates = await get_new_user_activities_async([username], cache_manager.vip_store.cursors)
+            await asyncio.to_thread(cache_manager.apply_vip_updates, updates)
+        except Exception as e:
+            print(f"Error fetching new user data: {e}")
+
+        return jsonify({"status": "success", "message": f"Followed {username}", "watchlist": watchlist})
+
+    return jsonify({"status": "info", "message": f"Already following {username}"})
+
+@app.route('/api/unfollow', methods=['POST'])
+async def unfollow_user():
+    data = await request.get_json()
+    username = data.get('username')
+
+    if not username:
+        return jsonify({"error": "Username required"}), 400
+
+    watchlist = cache_manager.watchlist
+    if username in watchlist:
+        watchlist.remove(username)
+        cache_manager.save_watchlist(watchlist)
+        await asyncio.to_thread(cache_manager.unfollow_user, username)
+
+        return jsonify({"status": "success", "message": f"Unfollowed {username}", "watchlist": watchlist})
+
+    return jsonify({"status": "info", "message": f"Not following {username}"})
+
+@app.route('/api/hidden-gems')
+async def get_hidden_gems():
+    gems = await asyncio.to_thread(cache_manager.get_hidden_gems, limit=6)
+    return jsonify(gems)
+
+@app.route('/api/hidden-gems/stream')
+async def stream_hidden_gems():
+    """NDJSON stream of the hidden gems, see web_server.hidden_gems_lines()."""
+    return Response(iterate_in_thread(hidden_gems_lines(limit=6)), mimetype='application/x-ndjson',
+                    headers=STREAM_HEADERS)
+
+@app.route('/api/search', methods=['POST'])
+async def search():
+    data = await request.get_json()
+    query = data.get('query')
+
+    if not query:
+        return jsonify({"error": "Query required"}), 400
+
+    expanded_query, repos = await search_cache.search_async(
+        query,
+        expand=lambda q: cache_manager.llm_analyzer.expand_search_query_async(q, raise_errors=True),
+        search=search_repos_async
+    )
+
+    for repo in repos:
+        repo['ai_analysis'] = f"{repo['description']} (Click to analyze)"
+
+    return jsonify({"results": repos, "expanded_query": expanded_query})
+
+@app.route('/api/translate', methods=['POST'])
+async def translate_text():
+    data = await request.get_json()
+    text = data.get('text')
+    target_language = data.get('target_language', 'zh-CN')
+
+    if not text:
+        return jsonify({"error": "Text required"}), 400
+
+    target_lang_name = LANGUAGE_NAMES.get(target_language, target_language)
+
+    translated_text = await cache_manager.llm_analyzer.translate_async(text, target_lang_name)
+    return jsonify({"translated_text": translated_text})
+
+@app.route('/api/translate/stream', methods=['POST'])
+async def translate_text_stream():
+    """Streaming /api/translate: SSE 'data' events carry {"delta"}, the final 'done' event {"text"}."""
+    data = await request.get_json()
+    text = data.get('text')
+    target_language = data.get('target_language', 'zh-CN')
+
+    if not text:
+        return jsonify({"error": "Text required"}), 400
+
+    target_lang_name = LANGUAGE_NAMES.get(target_language, target_language)
+    return sse_response(cache_manager.llm_analyzer.translate_stream_async(text, target_lang_name))
+
+@app.route('/api/analyze/stream', methods=['POST'])
+async def analyze_stream():
+    """Stream an AI analysis over SSE; same modes as the Flask endpoint."""
+    data = await request.get_json()
+
+    if not data.get('name'):
+        return jsonify({"error": "Name required"}), 400
+
+    return sse_response(analyze_stream_chunks(data))
+
+@app.route('/api/settings/token', methods=['POST'])
+async def save_token():
+    data = await request.get_json()
+    token = data.get('token') or ""
+
+    try:
+        write_token(token)
+        return jsonify({"status": "success", "message": "Token saved successfully"})
+    except Exception as e:
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+@app.route('/api/settings/token', methods=['GET'])
+async def get_token_status():
+    token = os.getenv("GITHUB_TOKEN")
+    return jsonify({
+        "has_token": bool(token),
+        "masked_token": f"{token[:4]}...{token[-4:]}" if token and len(token) > 8 else None
+    })
+
+@app.route('/api/metrics')
+async def get_metrics():
+    return jsonify({"llm": llm_metrics(), "search_cache": search_cache.stats(), "trending_cache": cache_manager.stale_stats(),
+                    "github": get_client().stats()})
+
+@app.route('/metrics')
+async def prometheus_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
+if __name__ == '__main__':
+    import uvicorn
+    print("Starting ASGI Web Server on http://localhost:5001")
+    uvicorn.run(app, host='0.0.0.0', port=5001)
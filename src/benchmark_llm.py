@@ -0,0 +1,72 @@
+# Measure cost per repo of batched LLM analysis.
+#
+# Runs analyze_repos over the same trending repos for each batch size with an
+# empty in-memory LLM cache, counting completions and usage tokens, e.g.:
+#     python src/benchmark_llm.py -n 10 --max-batch 10
+# Batch size 1 is the classic one-prompt-per-repo path. "calls" above the
+# number of batches are per-repo fallbacks for invalid batch answers.
+import math
+import time
+import argparse
+import threading
+from llm import LLMAnalyzer
+from llm_cache import LLMResultCache
+from scraper import get_trending_repos
+
+def run_batch_size(analyzer, repos, batch_size):
+    usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    lock = threading.Lock()
+
+    def counting(create):
+        def counting_create(*args, **kwargs):
+            response = create(*args, **kwargs)
+            with lock:
+                usage["calls"] += 1
+                if getattr(response, 'usage', None):
+                    usage["prompt_tokens"] += response.usage.prompt_tokens or 0
+                    usage["completion_tokens"] += response.usage.completion_tokens or 0
+            return response
+        return counting_create
+
+    analyzer.cache = LLMResultCache(db_path=":memory:")
+    originals = [backend.client.chat.completions.create for backend in analyzer.router.backends]
+    for backend, create in zip(analyzer.router.backends, originals):
+        backend.client.chat.completions.create = counting(create)
+    try:
+        started = time.perf_counter()
+        # One worker: measure the cost of the prompts, not the parallelism
+        analyzer.analyze_repos([dict(repo) for repo in repos], max_workers=1, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+    finally:
+        for backend, create in zip(analyzer.router.backends, originals):
+            backend.client.chat.completions.create = create
+
+    usage["batches"] = math.ceil(len(repos) / batch_size)
+    usage["seconds"] = elapsed
+    return usage
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare LLM cost per repo across batch sizes.")
+    parser.add_argument("-n", "--repos", type=int, default=10, help="Trending repos to analyze")
+    parser.add_argument("--max-batch", type=int, default=10, help="Largest batch size to try")
+    parser.add_argument("--since", default="daily", help="Trending period to sample repos from")
+    args = parser.parse_args()
+
+    analyzer = LLMAnalyzer()
+    if not analyzer.router:
+        raise SystemExit("No LLM client configured")
+    repos = get_trending_repos(since=args.since, limit=args.repos)
+    if not repos:
+        raise SystemExit("No repos fetched")
+
+    count = len(repos)
+    print(f"{count} repos, model {analyzer.model}")
+    print(f"{'batch':>5} {'calls':>6} {'fallbacks':>9} {'s/repo':>8} {'prompt tok/repo':>16} {'completion tok/repo':>20}")
+    for batch_size in range(1, args.max_batch + 1):
+        result = run_batch_size(analyzer, repos, batch_size)
+        fallbacks = result["calls"] - result["batches"] if batch_size > 1 else 0
+        print(f"{batch_size:>5} {result['calls']:>6} {fallbacks:>9} {result['seconds'] / count:>8.2f} "
+              f"{result['prompt_tokens'] / count:>16.1f} {result['completion_tokens'] / count:>20.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# Measure what projecting Search API items to RepoRecords saves.
+#
+# Compares raw items with compact records for the same repos: persisted cache
+# size, memory held by the cached list and bytes sent by /api/trending, e.g.:
+#     python src/benchmark_records.py -n 100
+#     python src/benchmark_records.py -n 100 --offline   # synthetic items, no network
+import gc
+import json
+import argparse
+import tracemalloc
+from repo_record import project_repos, json_default
+
+def sample_item(index):
+    """A Search API repository item with the full set of fields GitHub returns."""
+    owner = f"owner{index}"
+    full_name = f"{owner}/project-{index}"
+    api = f"https://api.github.com/repos/{full_name}"
+    item = {
+        "id": 700000000 + index, "node_id": f"R_kgDOK{index:08d}", "name": f"project-{index}",
+        "full_name": full_name, "private": False,
+        "owner": {
+            "login": owner, "id": 100000 + index, "node_id": f"U_kgDOB{index:06d}",
+            "avatar_url": f"https://avatars.githubusercontent.com/u/{100000 + index}?v=4", "gravatar_id": "",
+            "url": f"https://api.github.com/users/{owner}", "html_url": f"https://github.com/{owner}",
+            "type": "User", "site_admin": False, "user_view_type": "public"
+        },
+        "html_url": f"https://github.com/{full_name}",
+        "description": "A fast, batteries-included toolkit for building AI agents with local models.",
+        "fork": False, "url": api,
+        "created_at": "2026-01-30T08:12:44Z", "updated_at": "2026-01-31T10:01:02Z", "pushed_at": "2026-01-31T09:58:40Z",
+        "git_url": f"git://github.com/{full_name}.git", "ssh_url": f"git@github.com:{full_name}.git",
+        "clone_url": f"https://github.com/{full_name}.git", "svn_url": f"https://github.com/{full_name}",
+        "homepage": f"https://{owner}.github.io", "size": 1843, "stargazers_count": 5000 - index,
+        "watchers_count": 5000 - index, "language": "Python", "has_issues": True, "has_projects": True,
+        "has_downloads": True, "has_wiki": True, "has_pages": False, "has_discussions": False,
+        "forks_count": 120, "mirror_url": None, "archived": False, "disabled": False, "open_issues_count": 7,
+        "license": {"key": "mit", "name": "MIT License", "spdx_id": "MIT",
+                    "url": "https://api.github.com/licenses/mit", "node_id": "MDc6TGljZW5zZTEz"},
+        "allow_forking": True, "is_template": False, "web_commit_signoff_required": False,
+        "topics": ["ai", "agents", "llm"], "visibility": "public", "forks": 120, "open_issues": 7,
+        "watchers": 5000 - index, "default_branch": "main", "score": 1.0
+    }
+    # The *_url templates for every sub-resource
+    for resource in ("forks", "keys", "collaborators", "teams", "hooks", "issue_events", "events", "assignees",
+                     "branches", "tags", "blobs", "git_tags", "git_refs", "trees", "statuses", "languages",
+                     "stargazers", "contributors", "subscribers", "subscription", "commits", "git_commits",
+                     "comments", "issue_comment", "contents", "compare", "merges", "archive", "downloads",
+                     "issues", "pulls", "milestones", "notifications", "labels", "releases", "deployments"):
+        item[f"{resource}_url"] = f"{api}/{resource}{{/id}}"
+    for resource in ("followers", "following", "gists", "starred", "subscriptions", "organizations",
+                     "repos", "events", "received_events"):
+        item["owner"][f"{resource}_url"] = f"https://api.github.com/users/{owner}/{resource}"
+    return item
+
+def fetch_items(count):
+    from github_client import get_client
+    from scraper import SEARCH_PAGE_SIZE
+    items = []
+    page = 1
+    while len(items) < count:
+        data = get_client().get_json("/search/repositories", params={
+            "q": "stars:>1000", "sort": "stars", "order": "desc",
+            "per_page": min(SEARCH_PAGE_SIZE, count), "page": page
+        })
+        if not data.get("items"):
+            break
+        items.extend(data["items"])
+        page += 1
+    return items[:count]
+
+def held_bytes(build):
+    """Bytes still allocated after build() returns (the value is kept alive while measuring)."""
+    gc.collect()
+    tracemalloc.start()
+    value = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del value
+    return current
+
+def annotate(repos):
+    for repo in repos:
+        repo['ai_analysis'] = "这是一个为本地大模型打造的 AI Agent 工具包，开箱即用，适合想快速搭建智能体的开发者。"
+    return repos
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare raw Search API items with compact RepoRecords.")
+    parser.add_argument("-n", "--repos", type=int, default=100, help="Repos to measure")
+    parser.add_argument("--offline", action="store_true", help="Use synthetic items instead of the GitHub API")
+    args = parser.parse_args()
+
+    items = [sample_item(i) for i in range(args.repos)] if args.offline else fetch_items(args.repos)
+    raw_json = json.dumps(items)
+    count = len(items)
+
+    raw = {
+        # Cache entries are stored as JSON; /api/trending sends the same list with Flask's compact separators
+        "cache": len(json.dumps(annotate(json.loads(raw_json))).encode()),
+        "response": len(json.dumps(annotate(json.loads(raw_json)), separators=(",", ":")).encode()),
+        "memory": held_bytes(lambda: annotate(json.loads(raw_json)))
+    }
+    compact = {
+        "cache": len(json.dumps(annotate(project_repos(json.loads(raw_json))), default=json_default).encode()),
+        "response": len(json.dumps(annotate(project_repos(json.loads(raw_json))), default=json_default,
+                                   separators=(",", ":")).encode()),
+        "memory": held_bytes(lambda: annotate(project_repos(json.loads(raw_json))))
+    }
+
+    print(f"{count} repos")
+    print(f"{'':<22} {'raw items':>12} {'records':>12} {'saved':>8}")
+    for label, key in (("cache file bytes", "cache"), ("resident memory bytes", "memory"), ("response bytes", "response")):
+        saved = 1 - compact[key] / raw[key] if raw[key] else 0.0
+        print(f"{label:<22} {raw[key]:>12,} {compact[key]:>12,} {saved:>7.0%}")
+
+if __name__ == "__main__":
+    main()
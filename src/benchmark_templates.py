@@ -0,0 +1,80 @@
+# Measure report rendering with the shared, precompiled template environment.
+#
+# Compares the old per-call rendering (a new Environment loading index.html on
+# every call, markdown built by string concatenation) with generator.py's
+# module-level environment, e.g.:
+#     python src/benchmark_templates.py -n 200 --repos 25
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
+import generator
+from benchmark_records import sample_item
+from repo_record import project_repos
+
+def legacy_html(repos, vip_activities, date_str):
+    env = Environment(loader=FileSystemLoader(generator.TEMPLATE_DIR))
+    template = env.get_template('index.html')
+    return template.render(trending_repos=repos, vip_activities=vip_activities, date=date_str,
+                           last_updated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'), gurus={}, watchlist=[])
+
+def legacy_markdown(repos, date_str, period='daily'):
+    content = f"# GitHub {period.capitalize()} Trending - {date_str}\n\n"
+    content += f"> 📅 Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+    content += "Here are the trending repositories based on creation date and stars.\n\n"
+    content += "| Project | Stars | Language | AI Analysis |\n"
+    content += "|---------|-------|----------|-------------|\n"
+    for repo in repos:
+        analysis = (repo.get('ai_analysis') or '').replace('\n', ' ').replace('|', '\\|')
+        content += f"| [{repo.get('name')}]({repo.get('html_url')}) | {repo.get('stargazers_count')} | {repo.get('language') or 'Unknown'} | {analysis} |\n"
+    return content
+
+def cold_render(bytecode_dir):
+    """First render in a fresh environment, as after a process restart."""
+    env = Environment(loader=FileSystemLoader(generator.TEMPLATE_DIR), autoescape=select_autoescape(['html']),
+                      bytecode_cache=FileSystemBytecodeCache(bytecode_dir) if bytecode_dir else None)
+    return env.get_template('index.html').render(trending_repos=[], vip_activities=[], date='', last_updated='',
+                                                 gurus={}, watchlist=[])
+
+def per_call_ms(render, iterations):
+    render()  # warm-up
+    started = time.perf_counter()
+    for _ in range(iterations):
+        render()
+    return (time.perf_counter() - started) / iterations * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-call and precompiled report rendering.")
+    parser.add_argument("-n", "--iterations", type=int, default=200, help="Renders per measurement")
+    parser.add_argument("--repos", type=int, default=25, help="Repos in the rendered reports")
+    args = parser.parse_args()
+
+    repos = project_repos([sample_item(i) for i in range(args.repos)])
+    for repo in repos:
+        repo['ai_analysis'] = "面向本地大模型的 AI Agent 工具包 | 开箱即用，适合快速搭建智能体。"
+    vip = [{"type": "star", "user": "torvalds", "description": "starred", "repo_name": "a/b",
+            "repo_url": "https://github.com/a/b", "time": "2026-01-31 10:00"}] * 10
+    date_str = datetime.now().strftime('%Y-%m-%d')
+
+    bytecode_dir = tempfile.mkdtemp()
+    try:
+        cold_render(bytecode_dir)  # fill the bytecode cache
+        rows = [
+            ("html, new Environment per call", per_call_ms(lambda: legacy_html(repos, vip, date_str), args.iterations)),
+            ("html, shared environment", per_call_ms(lambda: generator.generate_html(repos, vip, date_str), args.iterations)),
+            ("markdown, string concatenation", per_call_ms(lambda: legacy_markdown(repos, date_str), args.iterations)),
+            ("markdown, shared environment", per_call_ms(lambda: generator.generate_markdown(repos, date_str), args.iterations)),
+            ("cold start, no bytecode cache", per_call_ms(lambda: cold_render(None), max(1, args.iterations // 10))),
+            ("cold start, bytecode cache", per_call_ms(lambda: cold_render(bytecode_dir), max(1, args.iterations // 10)))
+        ]
+    finally:
+        shutil.rmtree(bytecode_dir, ignore_errors=True)
+
+    print(f"{len(repos)} repos, {args.iterations} renders")
+    for label, ms in rows:
+        print(f"{label:<34} {ms:>9.3f} ms/call")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from repo_record import json_default
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend:
+    """
+    Storage interface used by TrendingCache.
+    Values are JSON-serializable; updated_at is a unix timestamp.
+    """
+
+    def load_all(self):
+        """Return (cache, last_update) dicts for every stored key."""
+        raise NotImplementedError
+
+    def get(self, key):
+        """Return (value, updated_at) for one key, or (None, 0) if missing."""
+        raise NotImplementedError
+
+    def get_many(self, keys):
+        """Return {key: (value, updated_at)} for the keys that are stored."""
+        raise NotImplementedError
+
+    def set_many(self, entries):
+        """Upsert {key: (value, updated_at)} atomically."""
+        raise NotImplementedError
+
+    def delete_older_than(self, prefix, cutoff):
+        """Delete keys starting with prefix whose updated_at is before cutoff."""
+        raise NotImplementedError
+
+class JSONCacheBackend(CacheBackend):
+    def __init__(self, cache_file="data/cache.json"):
+        """Legacy single-file store; every write rewrites the whole file."""
+        self.cache_file = cache_file
+        self._lock = threading.Lock()
+
+    def load_all(self):
+        if not os.path.exists(self.cache_file):
+            return {}, {}
+        with open(self.cache_file, 'r') as f:
+            data = json.load(f)
+        return data.get('cache', {}), data.get('last_update', {})
+
+    def get(self, key):
+        cache, last_update = self.load_all()
+        return cache.get(key), last_update.get(key, 0)
+
+    def get_many(self, keys):
+        cache, last_update = self.load_all()
+        return {key: (cache[key], last_update.get(key, 0)) for key in keys if key in cache}
+
+    def set_many(self, entries):
+        with self._lock:
+            cache, last_update = self.load_all()
+            for key, (value, updated_at) in entries.items():
+                cache[key] = value
+                last_update[key] = updated_at
+            self._write(cache, last_update)
+
+    def delete_older_than(self, prefix, cutoff):
+        with self._lock:
+            cache, last_update = self.load_all()
+            stale = [key for key in cache if key.startswith(prefix) and last_update.get(key, 0) < cutoff]
+            if not stale:
+                return
+            for key in stale:
+                cache.pop(key)
+                last_update.pop(key, None)
+            self._write(cache, last_update)
+
+    def _write(self, cache, last_update):
+        # Write to a temp file and rename so readers never see a partial file
+        tmp_file = f"{self.cache_file}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump({'cache': cache, 'last_update': last_update}, f, default=json_default)
+        os.replace(tmp_file, self.cache_file)
+
+class SQLiteCacheBackend(CacheBackend):
+    def __init__(self, db_path="data/cache.db", migrate_from=None):
+        """
+        Per-key store in SQLite WAL mode: readers in other processes are never
+        blocked by the writer, and each upsert is its own transaction.
+        :param migrate_from: Legacy JSON cache file imported once if the database is empty
+        """
+        self.db_path = db_path
+        self._local = threading.local()
+
+        with self._connect() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+
+        if migrate_from and os.path.exists(migrate_from):
+            self._migrate(migrate_from)
+
+    def _connect(self):
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _migrate(self, json_file):
+        conn = self._connect()
+        if conn.execute("SELECT COUNT(*) FROM cache_entries").fetchone()[0]:
+            return
+        try:
+            cache, last_update = JSONCacheBackend(json_file).load_all()
+        except Exception as e:
+            logger.error(f"Failed to read legacy cache {json_file}: {e}")
+            return
+
+        self.set_many({key: (value, last_update.get(key, 0)) for key, value in cache.items()})
+        try:
+            os.replace(json_file, f"{json_file}.migrated")
+        except FileNotFoundError:
+            # Another process sharing the data dir migrated it first
+            pass
+        logger.info(f"Migrated {len(cache)} cache entries from {json_file} to {self.db_path}")
+
+    def load_all(self):
+        rows = self._connect().execute("SELECT key, value, updated_at FROM cache_entries").fetchall()
+        cache = {key: json.loads(value) for key, value, _ in rows}
+        last_update = {key: updated_at for key, _, updated_at in rows}
+        return cache, last_update
+
+    def get(self, key):
+        row = self._connect().execute(
+            "SELECT value, updated_at FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None, 0
+        return json.loads(row[0]), row[1]
+
+    def get_many(self, keys):
+        keys = list(keys)
+        if not keys:
+            return {}
+        rows = self._connect().execute(
+            f"SELECT key, value, updated_at FROM cache_entries WHERE key IN ({', '.join('?' * len(keys))})", keys
+        ).fetchall()
+        return {key: (json.loads(value), updated_at) for key, value, updated_at in rows}
+
+    def set_many(self, entries):
+        rows = [(key, json.dumps(value, default=json_default), updated_at) for key, (value, updated_at) in entries.items()]
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT INTO cache_entries (key, value, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                rows
+            )
+
+    def delete_older_than(self, prefix, cutoff):
+        # substr() rather than LIKE so '_' and '%' in the prefix are taken literally
+        with self._connect() as conn:
+            conn.execute(
+                "DELETE FROM cache_entries WHERE substr(key, 1, ?) = ? AND updated_at < ?",
+                (len(prefix), prefix, cutoff)
+            )
+
+def create_backend(cache_file="data/cache.json"):
+    """
+    Pick the backend from CACHE_BACKEND ('sqlite' by default, or 'json').
+    The SQLite database sits next to cache_file and imports it on first use.
+    """
+    if os.getenv("CACHE_BACKEND", "sqlite").lower() == "json":
+        return JSONCacheBackend(cache_file)
+    db_path = os.path.splitext(cache_file)[0] + ".db"
+    return SQLiteCacheBackend(db_path, migrate_from=cache_file)
@@ -2,34 +2,76 @@ import time
 import logging
 import json
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from scraper import get_trending_repos
-from user_tracker import get_user_activities
+from scraper import get_trending_repos, search_hidden_gems
+from user_tracker import get_new_user_activities
 from llm import LLMAnalyzer
+from activity_store import ActivityStore
+from cache_backend import create_backend
+import metrics
 
 logger = logging.getLogger(__name__)
 
+CACHE_REQUESTS = metrics.counter("trending_cache_requests_total", "TrendingCache reads by key and result (fresh, reloaded, stale, miss)", ["key", "result"])
+REFRESH_SECONDS = metrics.histogram("trending_cache_refresh_duration_seconds", "Time to fetch and store one cache key", ["key"])
+REFRESH_FAILURES = metrics.counter("trending_cache_refresh_failures_total", "Cache refreshes that raised and kept the old value", ["key"])
+STALE_AGE = metrics.histogram("trending_cache_stale_age_seconds", "Age of expired entries served while revalidating", ["key"],
+                              buckets=(60, 300, 900, 1800, 3600, 7200, 21600, 43200, 86400))
+LAST_REFRESH = metrics.gauge("trending_cache_last_refresh_timestamp_seconds", "Unix time of the last successful refresh", ["key"])
+
 class TrendingCache:
-    def __init__(self, ttl_seconds=3600, cache_file="data/cache.json"):
+    # Keys persisted together with another key so they never drift apart
+    _LINKED_KEYS = {'vip_activities': ('vip_cursors',)}
+    # Shared full_name -> repo table; trending lists written by refresh_trending() hold full_names.
+    # The table only lives in memory: on disk every repo is its own 'repo:{full_name}' row, written
+    # together with the lists that reference it, so a process never writes back repos it did not fetch.
+    _REPO_TABLE_KEY = 'trending_repos'
+    _REPO_KEY_PREFIX = 'repo:'
+    _TRENDING_PERIODS = ('daily', 'weekly', 'monthly')
+
+    def __init__(self, ttl_seconds=3600, cache_file="data/cache.json", hard_ttl_seconds=None, stale_while_revalidate=True):
         """
         Initialize the cache.
         :param ttl_seconds: Time to live in seconds (default 1 hour)
+        :param hard_ttl_seconds: Age after which stale data is no longer served (default CACHE_HARD_TTL or 24 hours)
+        :param stale_while_revalidate: Serve expired data immediately and refresh it in the background
         """
+        # _cache and _last_update are shared by Flask request threads and
+        # background refreshes; every access goes through _lock
         self._cache = {}
         self._last_update = {}
+        # key -> number of in-process writes, so renderings can tell when a value changed
+        self._generations = {}
+        self._lock = threading.RLock()
+        # Serializes snapshot + write so an older value never overwrites a newer one on disk
+        self._persist_lock = threading.Lock()
         self._ttl = ttl_seconds
+        self._hard_ttl = hard_ttl_seconds if hard_ttl_seconds is not None else int(os.getenv("CACHE_HARD_TTL", "86400"))
+        self.stale_while_revalidate = stale_while_revalidate
+        
+        # Single-flight: key -> Future of the one fetch in progress for it.
+        # Foreground misses and background revalidation share these.
+        self._inflight = {}
+        self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+        self._stale_stats = {'served': 0, 'total_age': 0.0, 'max_age': 0.0}
         self.llm_analyzer = LLMAnalyzer()
         self.config_file = "watchlist.json"
         self.cache_file = cache_file
         
         # Create data dir
         os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        self.backend = create_backend(self.cache_file)
         
         # Load watchlist config
         self.watchlist = self._load_watchlist()
         
         # Load persistent cache
         self._load_cache()
+        
+        # Incremental VIP feed, rebuilt from the persisted list and per-user cursors
+        self._rebuild_vip_store()
 
     def _load_watchlist(self):
         if os.path.exists(self.config_file):
@@ -47,66 +89,429 @@ class TrendingCache:
 
     def _load_cache(self):
         """Load cache from disk"""
-        if os.path.exists(self.cache_file):
+        try:
+            cache, last_update = self.backend.load_all()
+            # Earlier versions stored the table as one entry; per-repo rows take precedence
+            table = cache.pop(self._REPO_TABLE_KEY, None) or {}
+            table_updated_at = last_update.pop(self._REPO_TABLE_KEY, 0)
+            for key in [k for k in cache if k.startswith(self._REPO_KEY_PREFIX)]:
+                table[key[len(self._REPO_KEY_PREFIX):]] = cache.pop(key)
+                table_updated_at = max(table_updated_at, last_update.pop(key, 0))
+            if table:
+                cache[self._REPO_TABLE_KEY] = table
+                last_update[self._REPO_TABLE_KEY] = table_updated_at
+            with self._lock:
+                self._cache, self._last_update = cache, last_update
+            logger.info("Cache loaded from disk.")
+        except Exception as e:
+            logger.error(f"Failed to load cache: {e}")
+
+    def _save_cache(self, *keys):
+        """Upsert the given keys (all keys if none given) to disk"""
+        with self._persist_lock:
+            with self._lock:
+                keys = keys or tuple(k for k in self._cache if k != self._REPO_TABLE_KEY)
+                entries = {}
+                for key in keys:
+                    for k in (key,) + self._LINKED_KEYS.get(key, ()):
+                        if k in self._cache:
+                            entries[k] = (self._cache[k], self._last_update.get(k, time.time()))
+                    entries.update(self._repo_rows(key))
             try:
-                with open(self.cache_file, 'r') as f:
-                    data = json.load(f)
-                    self._cache = data.get('cache', {})
-                    self._last_update = data.get('last_update', {})
-                    logger.info("Cache loaded from disk.")
+                self.backend.set_many(entries)
             except Exception as e:
-                logger.error(f"Failed to load cache: {e}")
+                logger.error(f"Failed to save cache: {e}")
+
+    def _repo_rows(self, key):
+        """'repo:{full_name}' rows for the repos a stored trending list references."""
+        names = self._cache.get(key)
+        if not self._is_name_list(names):
+            return {}
+        table = self._cache.get(self._REPO_TABLE_KEY, {})
+        updated_at = self._last_update.get(key, time.time())
+        return {f"{self._REPO_KEY_PREFIX}{name}": (table[name], updated_at) for name in names if name in table}
+
+    @staticmethod
+    def _is_name_list(value):
+        return bool(value) and isinstance(value, list) and isinstance(value[0], str)
 
-    def _save_cache(self):
-        """Save cache to disk"""
+    def _linked_keys(self, key):
+        if key.split('_', 1)[0] in self._TRENDING_PERIODS:
+            return (self._REPO_TABLE_KEY,)
+        return self._LINKED_KEYS.get(key, ())
+
+    def _get_entry(self, key):
+        """Return (value, age in seconds, present) as one consistent read."""
+        with self._lock:
+            return self._cache.get(key), time.time() - self._last_update.get(key, 0), key in self._cache
+
+    def _set_entry(self, key, value, updated_at=None):
+        with self._lock:
+            self._cache[key] = value
+            self._last_update[key] = updated_at if updated_at is not None else time.time()
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def data_version(self, *keys):
+        """
+        Opaque value that changes whenever any of the keys (or the entries linked to them,
+        such as the shared repo table of a trending list) is written.
+        """
+        keys = [k for key in keys for k in (key,) + self._linked_keys(key)]
+        with self._lock:
+            return tuple((self._last_update.get(key, 0), self._generations.get(key, 0)) for key in keys)
+
+    def updated_at(self, key):
+        """Unix time the key's data was fetched, 0 if never."""
+        with self._lock:
+            return self._last_update.get(key, 0)
+
+    def _reload_key(self, key):
+        """
+        Pick up a fresher copy of key written by another process (e.g. the worker).
+        Returns True if the in-memory copy was replaced.
+        """
         try:
-            with open(self.cache_file, 'w') as f:
-                json.dump({
-                    'cache': self._cache,
-                    'last_update': self._last_update
-                }, f)
+            value, updated_at = self.backend.get(key)
         except Exception as e:
-            logger.error(f"Failed to save cache: {e}")
+            logger.error(f"Failed to read {key} from cache backend: {e}")
+            return False
+        linked_entries = {}
+        for linked in self._LINKED_KEYS.get(key, ()):
+            linked_value, linked_updated_at = self.backend.get(linked)
+            if linked_value is not None:
+                linked_entries[linked] = (linked_value, linked_updated_at)
+        repos = {}
+        if self._is_name_list(value):
+            rows = self.backend.get_many(f"{self._REPO_KEY_PREFIX}{name}" for name in value)
+            repos = {row_key[len(self._REPO_KEY_PREFIX):]: repo for row_key, (repo, _) in rows.items()}
+
+        with self._lock:
+            if value is None or updated_at <= self._last_update.get(key, 0):
+                return False
+            self._set_entry(key, value, updated_at)
+            for linked, (linked_value, linked_updated_at) in linked_entries.items():
+                self._set_entry(linked, linked_value, linked_updated_at)
+            if repos:
+                self._merge_repo_table(repos, updated_at)
+            if key == 'vip_activities':
+                self._rebuild_vip_store()
+        return True
+
+    def _rebuild_vip_store(self):
+        with self._lock:
+            self.vip_store = ActivityStore.from_cache(
+                self._cache.get('vip_activities', []),
+                self._cache.get('vip_cursors', {})
+            )
 
     def get_data(self, since='daily', language='', force_refresh=False):
         """
         Get trending data from cache or fetch new data if expired.
         """
         cache_key = f"{since}_{language}"
-        return self._get_cached_or_fetch(cache_key, lambda: self._fetch_trending(since, language), force_refresh)
+        return self._resolve_repos(
+            self._get_cached_or_fetch(cache_key, lambda: self._fetch_trending(since, language), force_refresh)
+        )
+
+    def refresh_trending(self, combinations, max_workers=None):
+        """
+        Fan-out refresh of several (since, language) trending lists at once.
+        Lists are fetched concurrently, repos appearing in several lists are analyzed
+        once, and every list is stored as full_names into one shared repo table.
+        Lists already being fetched elsewhere are skipped; a list whose fetch fails keeps its old data.
+        Returns {cache_key: repos} for the lists refreshed here.
+        """
+        claimed = []
+        for since, language in dict.fromkeys(combinations):
+            key = f"{since}_{language}"
+            future, is_leader = self._claim(key)
+            if is_leader:
+                claimed.append((since, language, key, future))
+        if not claimed:
+            return {}
+
+        lists = {}
+        try:
+            workers = max(1, min(max_workers or int(os.getenv("SCRAPER_MAX_WORKERS", "4")), len(claimed)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                fetched = executor.map(lambda c: get_trending_repos(since=c[0], language=c[1], limit=10), claimed)
+                lists = {key: repos for (_, _, key, _), repos in zip(claimed, fetched) if repos}
+
+            table = {}
+            for repos in lists.values():
+                for repo in repos:
+                    table.setdefault(repo['full_name'], repo)
+            logger.info(f"Fan-out fetched {sum(len(repos) for repos in lists.values())} repos "
+                        f"in {len(lists)} lists, {len(table)} unique")
+            for _, _, key, _ in claimed:
+                if key not in lists:
+                    REFRESH_FAILURES.inc(key=key)
+            self.llm_analyzer.analyze_repos(list(table.values()))
+            self._store_trending_lists(
+                {key: [repo['full_name'] for repo in repos] for key, repos in lists.items()}, table
+            )
+        except Exception as e:
+            logger.error(f"Fan-out trending refresh failed: {e}")
+            lists = {}
+        finally:
+            results = {}
+            with self._lock:
+                for _, _, key, future in claimed:
+                    self._inflight.pop(key, None)
+                    results[key] = self._cache.get(key, [])
+            for _, _, key, future in claimed:
+                future.set_result(results[key])
+        return {key: self._resolve_repos(results[key]) for key in lists}
+
+    def _store_trending_lists(self, refs, table):
+        """Store list orderings and merge their repos into the shared table, dropping unreferenced repos."""
+        now = time.time()
+        with self._lock:
+            for key, names in refs.items():
+                self._set_entry(key, names, now)
+                LAST_REFRESH.set(now, key=key)
+            self._merge_repo_table(table, now)
+        self._save_cache(*refs)
+        try:
+            # Rows older than the hard TTL only back lists that are refetched before being served
+            self.backend.delete_older_than(self._REPO_KEY_PREFIX, now - self._hard_ttl)
+        except Exception as e:
+            logger.error(f"Failed to prune repo rows: {e}")
+
+    def _merge_repo_table(self, repos, updated_at):
+        """Merge repos into the in-memory table, keeping only repos some trending list references."""
+        with self._lock:
+            merged = dict(self._cache.get(self._REPO_TABLE_KEY, {}))
+            merged.update(repos)
+            referenced = set()
+            for key, value in self._cache.items():
+                if self._linked_keys(key) == (self._REPO_TABLE_KEY,) and self._is_name_list(value):
+                    referenced.update(value)
+            updated_at = max(updated_at, self._last_update.get(self._REPO_TABLE_KEY, 0))
+            self._set_entry(self._REPO_TABLE_KEY, {name: merged[name] for name in referenced if name in merged}, updated_at)
+
+    def _resolve_repos(self, value):
+        """Turn a stored list of full_names into repos; lists of repos (legacy or single fetch) pass through."""
+        if not self._is_name_list(value):
+            return value
+        with self._lock:
+            table = self._cache.get(self._REPO_TABLE_KEY, {})
+            return [table[name] for name in value if name in table]
 
     def get_vip_activities(self, force_refresh=False):
         """
         Get VIP activities from cache or fetch.
         """
         cache_key = "vip_activities"
-        return self._get_cached_or_fetch(cache_key, lambda: get_user_activities(self.watchlist), force_refresh)
+        return self._get_cached_or_fetch(cache_key, self._fetch_vip_activities, force_refresh)
+
+    def get_hidden_gems(self, limit=6, force_refresh=False):
+        """
+        Get hidden gems with their potential analysis from cache or fetch.
+        """
+        cache_key = f"hidden_gems_{limit}"
+        return self._get_cached_or_fetch(cache_key, lambda: self._fetch_hidden_gems(limit), force_refresh)
+
+    def stream_hidden_gems(self, limit=6):
+        """
+        Progressive variant of get_hidden_gems().
+        Yields ('gems', gems) with the raw GitHub results first, then ('analysis', index, text)
+        as each analysis finishes. Cached gems are yielded once, already analyzed.
+        """
+        cache_key = f"hidden_gems_{limit}"
+        _, age, present = self._get_entry(cache_key)
+        if present and (age < self._ttl or (self.stale_while_revalidate and age < self._hard_ttl)):
+            yield 'gems', self.get_hidden_gems(limit=limit)
+            return
+
+        # Same single-flight as _refresh(): one stream fetches, concurrent ones wait for its result
+        future, is_leader = self._claim(cache_key)
+        if not is_leader:
+            logger.info(f"Waiting for in-flight fetch of {cache_key}")
+            yield 'gems', future.result()
+            return
+
+        started = time.perf_counter()
+        gems = []
+        result = None
+        try:
+            value, age, present = self._get_entry(cache_key)
+            if present and age < self._ttl:
+                # Refreshed by the previous leader between the check above and the claim
+                result = value
+                yield 'gems', value
+                return
+
+            gems = search_hidden_gems(limit=limit)
+            yield 'gems', [dict(gem) for gem in gems]
+
+            for index, analysis in self._analyze_gems(gems):
+                gems[index]['gem_analysis'] = analysis
+                yield 'analysis', index, analysis
+
+            # Fully analyzed, so the JSON endpoint and the next visitor get it from cache
+            self._set_entry(cache_key, gems)
+            self._save_cache(cache_key)
+            REFRESH_SECONDS.observe(time.perf_counter() - started, key=cache_key)
+            LAST_REFRESH.set(time.time(), key=cache_key)
+            result = gems
+        except Exception as e:
+            logger.error(f"Failed to refresh {cache_key}: {e}")
+            REFRESH_FAILURES.inc(key=cache_key)
+            with self._lock:
+                result = self._cache.get(cache_key, [])
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(cache_key, None)
+            # A stream closed early (client went away) hands waiters what it has so far
+            future.set_result(result if result is not None else gems)
+
+    def follow_user(self, username):
+        """Fetch a newly followed user's activities and merge them into the VIP feed."""
+        self.apply_vip_updates(get_new_user_activities([username], self.vip_store.cursors))
+
+    def apply_vip_updates(self, updates):
+        """Merge {user: (activities, cursor)} fetched elsewhere (e.g. by the async server) and persist."""
+        self._merge_vip_updates(updates)
+        self._store_vip_activities()
+
+    def unfollow_user(self, username):
+        """Remove a user's activities from the VIP feed."""
+        self.vip_store.remove_user(username)
+        self._store_vip_activities()
 
     def _get_cached_or_fetch(self, key, fetch_func, force_refresh):
-        now = time.time()
-        last_update = self._last_update.get(key, 0)
-        
-        if not force_refresh and (now - last_update < self._ttl) and (key in self._cache):
-            logger.info(f"Returning cached data for {key}")
-            return self._cache[key]
+        if not force_refresh:
+            value, age, present = self._get_entry(key)
+            if present and (age < self._ttl):
+                logger.info(f"Returning cached data for {key}")
+                CACHE_REQUESTS.inc(key=key, result="fresh")
+                return value
+            
+            if self._reload_key(key):
+                value, age, present = self._get_entry(key)
+                if age < self._ttl:
+                    logger.info(f"Returning data for {key} refreshed by another process")
+                    CACHE_REQUESTS.inc(key=key, result="reloaded")
+                    return value
+            
+            # Soft TTL passed: serve what we have and revalidate off the request thread
+            if self.stale_while_revalidate and present and (age < self._hard_ttl):
+                self._record_stale(key, age)
+                self._schedule_refresh(key, fetch_func)
+                logger.info(f"Returning stale data for {key} ({age:.0f}s old), refreshing in background")
+                CACHE_REQUESTS.inc(key=key, result="stale")
+                return value
         
         logger.info(f"Cache expired or missing for {key}. Fetching...")
+        CACHE_REQUESTS.inc(key=key, result="miss")
+        return self._refresh(key, fetch_func)
+
+    def _claim(self, key):
+        """
+        Join the fetch in progress for key, or become its leader.
+        Returns (future, is_leader).
+        """
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                return future, False
+            future = Future()
+            self._inflight[key] = future
+            return future, True
+
+    def _refresh(self, key, fetch_func):
+        future, is_leader = self._claim(key)
+        if not is_leader:
+            # Someone else is already fetching this key; share their result
+            logger.info(f"Waiting for in-flight fetch of {key}")
+            return future.result()
+        return self._run_fetch(key, fetch_func, future)
+
+    def _run_fetch(self, key, fetch_func, future):
+        started = time.perf_counter()
         try:
             data = fetch_func()
-            self._cache[key] = data
-            self._last_update[key] = time.time()
-            self._save_cache() # Persist immediately
-            return data
+            self._set_entry(key, data)
+            self._save_cache(key) # Persist immediately
+            REFRESH_SECONDS.observe(time.perf_counter() - started, key=key)
+            LAST_REFRESH.set(time.time(), key=key)
         except Exception as e:
             logger.error(f"Failed to refresh {key}: {e}")
-            return self._cache.get(key, [])
+            REFRESH_FAILURES.inc(key=key)
+            with self._lock:
+                data = self._cache.get(key, [])
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        future.set_result(data)
+        return data
+
+    def _schedule_refresh(self, key, fetch_func):
+        future, is_leader = self._claim(key)
+        if is_leader:
+            self._refresh_executor.submit(self._run_fetch, key, fetch_func, future)
+
+    def _record_stale(self, key, age):
+        STALE_AGE.observe(age, key=key)
+        with self._lock:
+            self._stale_stats['served'] += 1
+            self._stale_stats['total_age'] += age
+            self._stale_stats['max_age'] = max(self._stale_stats['max_age'], age)
+
+    def stale_stats(self):
+        """How often stale data was served and how old it was, in seconds."""
+        with self._lock:
+            stats = dict(self._stale_stats)
+            stats['in_flight'] = len(self._inflight)
+        stats['avg_age'] = round(stats['total_age'] / stats['served'], 1) if stats['served'] else 0.0
+        return stats
+
+    def _fetch_vip_activities(self):
+        # Only events newer than each user's cursor are fetched and merged
+        self._merge_vip_updates(get_new_user_activities(self.watchlist, self.vip_store.cursors))
+        for user in self.vip_store.users() - set(self.watchlist):
+            self.vip_store.remove_user(user)
+        self._set_entry('vip_cursors', dict(self.vip_store.cursors))
+        return self.vip_store.to_list()
+
+    def _merge_vip_updates(self, updates):
+        for user, (activities, cursor) in updates.items():
+            self.vip_store.add(user, activities, cursor)
+
+    def _store_vip_activities(self):
+        with self._lock:
+            self._cache['vip_activities'] = self.vip_store.to_list()
+            self._cache['vip_cursors'] = dict(self.vip_store.cursors)
+            # Not a fetch, so the TTL is kept; only the generation moves
+            for key in ('vip_activities', 'vip_cursors'):
+                self._generations[key] = self._generations.get(key, 0) + 1
+        self._save_cache('vip_activities')
+
+    def _fetch_hidden_gems(self, limit):
+        gems = search_hidden_gems(limit=limit)
+        for index, analysis in self._analyze_gems(gems):
+            gems[index]['gem_analysis'] = analysis
+        return gems
+
+    def _analyze_gems(self, gems):
+        """Run analyze_potential for all gems concurrently, yielding (index, analysis) as each finishes."""
+        if not gems:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.llm_analyzer.max_workers, len(gems))) as executor:
+            futures = {
+                executor.submit(
+                    self.llm_analyzer.analyze_potential,
+                    gem['name'],
+                    gem['description'] or '',
+                    gem['language'] or 'Unknown'
+                ): index
+                for index, gem in enumerate(gems)
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
 
     def _fetch_trending(self, since, language):
         repos = get_trending_repos(since=since, language=language, limit=10)
-        for repo in repos:
-            repo['ai_analysis'] = self.llm_analyzer.analyze_repo(
-                repo['name'], 
-                repo['description'], 
-                repo['language']
-            )
-        return repos
+        return self.llm_analyzer.analyze_repos(repos)
@@ -1,56 +1,123 @@
 from datetime import datetime
+from contextlib import contextmanager
+import io
 import os
 import json
-from jinja2 import Environment, FileSystemLoader
+import tempfile
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), 'templates')
+# Compiled template bytecode survives restarts, so a new process skips parsing the templates
+TEMPLATE_CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR") or os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'template_cache')
+# Only check templates for edits in dev mode; otherwise they are compiled once per process
+DEV_MODE = os.getenv("DEV_MODE", "").lower() in ("1", "true", "yes")
+
+def _table_cell(value):
+    """Keep text on one line and escape pipes so it cannot break a markdown table row."""
+    return (value or '').replace('\n', ' ').replace('|', '\\|')
+
+os.makedirs(TEMPLATE_CACHE_DIR, exist_ok=True)
+env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    bytecode_cache=FileSystemBytecodeCache(TEMPLATE_CACHE_DIR),
+    autoescape=select_autoescape(['html']),
+    auto_reload=DEV_MODE,
+    # Section templates end exactly where their output does, so they can be written back to back
+    keep_trailing_newline=True
+)
+env.filters['table_cell'] = _table_cell
+
+# Precompile at import so the first report does not pay for it
+for _name in ('index.html', 'report_header.md', 'today_header.md', 'trending_table.md', 'vip_activity.md'):
+    env.get_template(_name)
+
+class ReportWriter:
+    def __init__(self, sink):
+        """
+        Streams report sections into a file-like sink (anything with write(str)).
+        Templates are rendered chunk by chunk, so a report is never held in memory as a whole.
+        """
+        self.sink = sink
+
+    def write(self, text):
+        self.sink.write(text)
+        return self
+
+    def render(self, template_name, **context):
+        for chunk in env.get_template(template_name).generate(**context):
+            self.sink.write(chunk)
+        return self
+
+    def trending_header(self, date_str, period='daily'):
+        return self.render('report_header.md', date=date_str, period=period,
+                           generated_at=datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+
+    def today_header(self, date_str):
+        return self.render('today_header.md', date=date_str, time=datetime.now().strftime('%H:%M'))
+
+    def trending_table(self, repos):
+        return self.render('trending_table.md', repos=repos)
+
+    def vip_activity(self, activities):
+        return self.render('vip_activity.md', activities=activities)
+
+    def dashboard(self, repos, vip_activities, date_str, gurus=None, watchlist=None):
+        return self.render('index.html',
+                           trending_repos=repos,
+                           vip_activities=vip_activities,
+                           date=date_str,
+                           last_updated=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                           gurus=gurus or {},
+                           watchlist=watchlist or [])
+
+@contextmanager
+def atomic_writer(filename):
+    """
+    Open filename for writing through a temp file in the same directory that replaces it on success,
+    so readers see either the old or the new file, never a partial one. On error the target is untouched.
+    """
+    dirname = os.path.dirname(filename)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    try:
+        mode = os.stat(filename).st_mode & 0o777
+    except FileNotFoundError:
+        mode = 0o644
+    fd, tmp_path = tempfile.mkstemp(dir=dirname or '.', prefix=f".{os.path.basename(filename)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
 
 def generate_markdown(repos, date_str, period='daily'):
     """
     Generate a markdown report for the repositories.
+    Use ReportWriter(sink).trending_header(...).trending_table(...) to stream it to a file instead.
     """
-    title = f"GitHub {period.capitalize()} Trending - {date_str}"
-    
-    content = f"# {title}\n\n"
-    content += f"> 📅 Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-    content += "Here are the trending repositories based on creation date and stars.\n\n"
-    
-    content += "| Project | Stars | Language | AI Analysis |\n"
-    content += "|---------|-------|----------|-------------|\n"
-    
-    for repo in repos:
-        name = repo.get('name')
-        url = repo.get('html_url')
-        stars = repo.get('stargazers_count')
-        language = repo.get('language') or 'Unknown'
-        analysis = repo.get('ai_analysis', '').replace('\n', ' ')
-        
-        # Escape pipes in analysis to avoid breaking table
-        analysis = analysis.replace('|', '\\|')
-        
-        content += f"| [{name}]({url}) | {stars} | {language} | {analysis} |\n"
-        
-    return content
-
-def generate_html(repos, vip_activities, date_str):
+    buffer = io.StringIO()
+    ReportWriter(buffer).trending_header(date_str, period).trending_table(repos)
+    return buffer.getvalue()
+
+def generate_html(repos, vip_activities, date_str, gurus=None, watchlist=None):
     """
     Generate an HTML dashboard using Jinja2 template.
     """
-    env = Environment(loader=FileSystemLoader('src/templates'))
-    template = env.get_template('index.html')
-    
-    return template.render(
-        trending_repos=repos,
-        vip_activities=vip_activities,
-        date=date_str,
-        last_updated=datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    )
+    buffer = io.StringIO()
+    ReportWriter(buffer).dashboard(repos, vip_activities, date_str, gurus, watchlist)
+    return buffer.getvalue()
 
 def save_report(content, filename):
-    """Save content to file"""
-    dirname = os.path.dirname(filename)
-    if dirname:
-        os.makedirs(dirname, exist_ok=True)
-        
-    with open(filename, 'w', encoding='utf-8') as f:
+    """Save content to file (atomically)"""
+    with atomic_writer(filename) as f:
         f.write(content)
 
 def update_readme(latest_report_link, date_str):
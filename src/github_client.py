@@ -0,0 +1,275 @@
+import os
+import re
+import json
+import time
+import logging
+import asyncio
+import threading
+import requests
+from collections import OrderedDict
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+import metrics
+
+logger = logging.getLogger(__name__)
+
+REQUESTS = metrics.counter("github_requests_total", "GitHub API responses by endpoint and status ('error' for connection failures)", ["endpoint", "status"])
+REQUEST_SECONDS = metrics.histogram("github_request_duration_seconds", "GitHub API request latency per attempt", ["endpoint"])
+RATE_LIMIT_REMAINING = metrics.gauge("github_rate_limit_remaining", "Requests left in the current GitHub rate limit window", ["resource"])
+
+# Load env vars at module level, but also allow dynamic reload
+load_dotenv()
+
+def get_token():
+    # Force reload to pick up changes from .env
+    load_dotenv(override=True)
+    return os.getenv("GITHUB_TOKEN")
+
+class GitHubClient:
+    def __init__(self, base_url=None, timeout=None, max_retries=None, backoff=1.0, pool_size=20, max_conditional=1000):
+        """
+        Shared GitHub REST client with a pooled keep-alive session.
+        :param timeout: Seconds to wait for connect/read on each attempt
+        :param max_retries: Extra attempts on 5xx, connection errors and secondary rate limits
+        :param backoff: Base delay in seconds, doubled on every retry
+        :param max_conditional: Max URLs whose ETag/Last-Modified and body are kept for revalidation
+        """
+        self.base_url = (base_url or os.getenv("GITHUB_API_URL", "https://api.github.com")).rstrip('/')
+        self.timeout = timeout if timeout is not None else float(os.getenv("GITHUB_TIMEOUT", "10"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("GITHUB_MAX_RETRIES", "3"))
+        self.backoff = backoff
+        self.pool_size = pool_size
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept": "application/vnd.github.v3+json"})
+        # Created lazily by get_json_async()
+        self._async_client = None
+
+        # (url, params) -> {etag, last_modified, content}, least recently used first
+        self._conditional = OrderedDict()
+        self._max_conditional = max_conditional
+        # endpoint -> {requests, not_modified}
+        self._endpoint_stats = {}
+        # rate limit resource ("core", "search") -> (remaining, reset epoch)
+        self._rate_limits = {}
+        self._lock = threading.Lock()
+
+    def _headers(self):
+        headers = {}
+        # Add token if available to increase rate limit
+        token = get_token()
+        if token:
+            headers["Authorization"] = f"token {token}"
+        return headers
+
+    def get_json(self, path, params=None):
+        """
+        GET a GitHub API path and return the decoded JSON body.
+        Repeat requests are sent as conditional requests; a 304 serves the stored body.
+        Raises requests.exceptions.RequestException once retries are exhausted.
+        """
+        url, cache_key, headers, stored = self._prepare(path, params)
+
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError) as e:
+                self._observe(path, "error", started)
+                error = e
+            else:
+                self._observe(path, response.status_code, started)
+                self._track_rate_limit(response)
+
+                if attempt < self.max_retries and self._should_retry(response):
+                    delay = self._retry_delay(response, attempt)
+                    logger.warning(f"GitHub returned {response.status_code} for {path}, retrying in {delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+
+                try:
+                    return self._finish(path, cache_key, stored, response)
+                except requests.exceptions.ContentDecodingError as e:
+                    error = e
+
+            if attempt == self.max_retries:
+                raise error
+            delay = self.backoff * (2 ** attempt)
+            logger.warning(f"GitHub request to {path} failed ({error}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    async def get_json_async(self, path, params=None):
+        """
+        Async variant of get_json() over a pooled httpx.AsyncClient.
+        Shares the conditional request store, stats and rate limits with the sync path,
+        and raises the same requests.exceptions.RequestException types.
+        """
+        import httpx # Only the ASGI server needs httpx
+
+        url, cache_key, headers, stored = self._prepare(path, params)
+        session = self._async_session()
+
+        for attempt in range(self.max_retries + 1):
+            started = time.perf_counter()
+            try:
+                response = await session.get(url, params=params, headers=headers)
+            except httpx.TransportError as e:
+                # Connect/read errors, timeouts and dropped connections (RemoteProtocolError)
+                self._observe(path, "error", started)
+                error = requests.exceptions.ConnectionError(f"{type(e).__name__}: {e}")
+            except httpx.DecodingError as e:
+                self._observe(path, "error", started)
+                error = requests.exceptions.ContentDecodingError(str(e))
+            else:
+                self._observe(path, response.status_code, started)
+                self._track_rate_limit(response)
+
+                if attempt < self.max_retries and self._should_retry(response):
+                    delay = self._retry_delay(response, attempt)
+                    logger.warning(f"GitHub returned {response.status_code} for {path}, retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+                    continue
+
+                try:
+                    return self._finish(path, cache_key, stored, response)
+                except requests.exceptions.ContentDecodingError as e:
+                    error = e
+
+            if attempt == self.max_retries:
+                raise error
+            delay = self.backoff * (2 ** attempt)
+            logger.warning(f"GitHub request to {path} failed ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    def _async_session(self):
+        import httpx
+
+        # httpx.AsyncClient is bound to the event loop that first used it
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                headers={"Accept": "application/vnd.github.v3+json"},
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            )
+        return self._async_client
+
+    def _prepare(self, path, params):
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+        cache_key = (url, tuple(sorted((params or {}).items())))
+
+        headers = self._headers()
+        with self._lock:
+            stored = self._conditional.get(cache_key)
+        if stored:
+            if stored['etag']:
+                headers["If-None-Match"] = stored['etag']
+            if stored['last_modified']:
+                headers["If-Modified-Since"] = stored['last_modified']
+        return url, cache_key, headers, stored
+
+    def _finish(self, path, cache_key, stored, response):
+        if response.status_code == 304 and stored:
+            self._record(path, not_modified=True)
+            with self._lock:
+                if cache_key in self._conditional:
+                    self._conditional.move_to_end(cache_key)
+            # Decode a fresh copy, callers annotate the items in place
+            return json.loads(stored['content'])
+
+        if response.status_code >= 400:
+            # Same exception for requests and httpx responses, so callers handle one type
+            raise requests.exceptions.HTTPError(f"{response.status_code} Error for {path}", response=response)
+        try:
+            body = response.json()
+        except ValueError as e:
+            # Truncated or non-JSON body (e.g. a proxy error page); retried like a dropped connection
+            raise requests.exceptions.ContentDecodingError(f"Invalid JSON from {path}: {e}", response=response)
+        self._record(path, not_modified=False)
+        self._remember(cache_key, response)
+        return body
+
+    def _remember(self, cache_key, response):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        with self._lock:
+            self._conditional[cache_key] = {
+                'etag': etag,
+                'last_modified': last_modified,
+                'content': response.content
+            }
+            self._conditional.move_to_end(cache_key)
+            while len(self._conditional) > self._max_conditional:
+                self._conditional.popitem(last=False)
+
+    def _track_rate_limit(self, response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        if remaining is None or not remaining.isdigit():
+            return
+        resource = response.headers.get("X-RateLimit-Resource", "core")
+        reset = response.headers.get("X-RateLimit-Reset", "")
+        with self._lock:
+            self._rate_limits[resource] = (int(remaining), int(reset) if reset.isdigit() else None)
+        RATE_LIMIT_REMAINING.set(int(remaining), resource=resource)
+
+    def rate_limit(self, resource="core"):
+        """
+        Last seen (remaining, reset epoch) for a rate limit resource.
+        Returns (None, None) before any response was seen or after the window reset.
+        """
+        with self._lock:
+            remaining, reset = self._rate_limits.get(resource, (None, None))
+        if reset is not None and reset <= time.time():
+            return None, None
+        return remaining, reset
+
+    def _observe(self, path, status, started):
+        endpoint = self._endpoint(path)
+        REQUESTS.inc(endpoint=endpoint, status=status)
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+
+    @staticmethod
+    def _endpoint(path):
+        # Group per-user URLs so stats stay per endpoint, not per user
+        return re.sub(r'^/users/[^/]+/', '/users/{user}/', path)
+
+    def _record(self, path, not_modified):
+        endpoint = self._endpoint(path)
+        with self._lock:
+            stats = self._endpoint_stats.setdefault(endpoint, {'requests': 0, 'not_modified': 0})
+            stats['requests'] += 1
+            if not_modified:
+                stats['not_modified'] += 1
+
+    def stats(self):
+        """Per-endpoint request counts and how many were answered with 304 Not Modified."""
+        with self._lock:
+            return {endpoint: dict(counts) for endpoint, counts in self._endpoint_stats.items()}
+
+    def _should_retry(self, response):
+        if response.status_code >= 500 or response.status_code == 429:
+            return True
+        # Secondary rate limits come back as 403 with a Retry-After header
+        return response.status_code == 403 and "Retry-After" in response.headers
+
+    def _retry_delay(self, response, attempt):
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * (2 ** attempt)
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """Process-wide client so every caller shares one connection pool."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GitHubClient()
+        return _client
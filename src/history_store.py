@@ -0,0 +1,208 @@
+import os
+import re
+import sqlite3
+import logging
+import argparse
+import threading
+from datetime import date, timedelta
+
+logger = logging.getLogger(__name__)
+
+# One row of a report table: | [name](https://github.com/owner/repo) | stars | language | analysis |
+_ROW = re.compile(r'^\| \[(?P<name>[^\]]*)\]\((?P<url>[^)\s]+)\) \| (?P<stars>\d+) \| (?P<language>[^|]*?) \|')
+_ARCHIVE_NAME = re.compile(r'^(\d{4}-\d{2}-\d{2})\.md$')
+
+class HistoryStore:
+    def __init__(self, db_path="data/history.db"):
+        """
+        Daily trending snapshots (date, full_name, stars, language, rank) in SQLite,
+        indexed by date and by repo so history queries never re-read the markdown archives.
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        dirname = os.path.dirname(self.db_path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS repo_history (
+                date TEXT NOT NULL,
+                full_name TEXT NOT NULL,
+                stars INTEGER NOT NULL,
+                language TEXT,
+                rank INTEGER NOT NULL,
+                PRIMARY KEY (date, full_name)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_repo_history_repo ON repo_history (full_name, date)")
+        self._conn.commit()
+
+    def record_snapshot(self, date_str, repos):
+        """
+        Store the ranked list of a day, replacing an earlier snapshot of the same day.
+        repos are repo dicts/RepoRecords (full_name, stargazers_count, language) in rank order.
+        """
+        rows = []
+        seen = set()
+        for repo in repos:
+            full_name = repo.get('full_name') or repo.get('name')
+            if not full_name or full_name in seen:
+                continue
+            seen.add(full_name)
+            rows.append((date_str, full_name, repo.get('stargazers_count') or 0, repo.get('language'), len(rows) + 1))
+
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM repo_history WHERE date = ?", (date_str,))
+                self._conn.executemany(
+                    "INSERT INTO repo_history (date, full_name, stars, language, rank) VALUES (?, ?, ?, ?, ?)",
+                    rows
+                )
+        return len(rows)
+
+    def import_archives(self, directory="archives"):
+        """
+        Backfill from the markdown reports in directory (YYYY-MM-DD.md).
+        Returns (files imported, rows stored).
+        """
+        if not os.path.isdir(directory):
+            return 0, 0
+        files = rows = 0
+        for filename in sorted(os.listdir(directory)):
+            match = _ARCHIVE_NAME.match(filename)
+            if not match:
+                continue
+            with open(os.path.join(directory, filename), 'r', encoding='utf-8') as f:
+                repos = parse_report(f)
+            if repos:
+                rows += self.record_snapshot(match.group(1), repos)
+                files += 1
+        logger.info(f"Imported {rows} history rows from {files} archives in {directory}")
+        return files, rows
+
+    def star_velocity(self, full_name, days=90, today=None):
+        """
+        Stars gained by a repo over the last days, from its first to its last snapshot in that window.
+        Returns None if the repo has no snapshot in the window.
+        """
+        since, until = self._window(days, today)
+        with self._lock:
+            points = self._conn.execute(
+                "SELECT date, stars, rank FROM repo_history WHERE full_name = ? AND date BETWEEN ? AND ? ORDER BY date",
+                (full_name, since, until)
+            ).fetchall()
+        if not points:
+            return None
+
+        first_date, first_stars, _ = points[0]
+        last_date, last_stars, _ = points[-1]
+        span = (date.fromisoformat(last_date) - date.fromisoformat(first_date)).days
+        return {
+            "full_name": full_name,
+            "first_date": first_date,
+            "last_date": last_date,
+            "stars_gained": last_stars - first_stars,
+            "stars_per_day": round((last_stars - first_stars) / span, 2) if span else 0.0,
+            "points": [{"date": d, "stars": s, "rank": r} for d, s, r in points]
+        }
+
+    def top_risers(self, days=7, limit=10, today=None):
+        """Repos seen on at least two days of the window, by stars gained between their first and last snapshot."""
+        since, until = self._window(days, today)
+        with self._lock:
+            rows = self._conn.execute("""
+                WITH span AS (
+                    SELECT full_name, MIN(date) AS first_date, MAX(date) AS last_date
+                    FROM repo_history WHERE date BETWEEN ? AND ?
+                    GROUP BY full_name HAVING first_date < last_date
+                )
+                SELECT span.full_name, end_row.language, start_row.stars, end_row.stars,
+                       end_row.stars - start_row.stars AS gained, span.first_date, span.last_date, end_row.rank
+                FROM span
+                JOIN repo_history AS start_row ON start_row.full_name = span.full_name AND start_row.date = span.first_date
+                JOIN repo_history AS end_row ON end_row.full_name = span.full_name AND end_row.date = span.last_date
+                ORDER BY gained DESC, span.full_name
+                LIMIT ?
+            """, (since, until, limit)).fetchall()
+        return [
+            {
+                "full_name": full_name,
+                "language": language,
+                "start_stars": start_stars,
+                "stars": stars,
+                "stars_gained": gained,
+                "first_date": first_date,
+                "last_date": last_date,
+                "rank": rank
+            }
+            for full_name, language, start_stars, stars, gained, first_date, last_date, rank in rows
+        ]
+
+    def archive_dates(self):
+        """Archived days, newest first, with the number of repos stored for each."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, COUNT(*) FROM repo_history GROUP BY date ORDER BY date DESC"
+            ).fetchall()
+        return [{"date": d, "repos": count} for d, count in rows]
+
+    def is_empty(self):
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM repo_history LIMIT 1").fetchone() is None
+
+    @staticmethod
+    def _window(days, today):
+        until = today or date.today()
+        return (until - timedelta(days=days)).isoformat(), until.isoformat()
+
+def parse_report(lines):
+    """Repos of a markdown report table in rank order, as dicts with full_name, stargazers_count and language."""
+    repos = []
+    for line in lines:
+        match = _ROW.match(line)
+        if not match:
+            continue
+        url = match.group('url').rstrip('/')
+        # full_name is the owner/repo path of the GitHub URL; the link text is only the repo name
+        full_name = '/'.join(url.split('/')[-2:]) if url.count('/') >= 4 else match.group('name')
+        language = match.group('language').strip()
+        repos.append({
+            "full_name": full_name,
+            "stargazers_count": int(match.group('stars')),
+            "language": None if language in ('', 'Unknown') else language
+        })
+    return repos
+
+def main():
+    parser = argparse.ArgumentParser(description="Trending history built from the daily archives.")
+    parser.add_argument("--db", default=os.getenv("HISTORY_DB_PATH", "data/history.db"), help="History database")
+    commands = parser.add_subparsers(dest="command", required=True)
+    backfill = commands.add_parser("import", help="Backfill from markdown archives")
+    backfill.add_argument("directory", nargs="?", default="archives")
+    velocity = commands.add_parser("velocity", help="Star velocity of a repo")
+    velocity.add_argument("full_name")
+    velocity.add_argument("--days", type=int, default=90)
+    risers = commands.add_parser("risers", help="Top risers")
+    risers.add_argument("--days", type=int, default=7)
+    risers.add_argument("-n", "--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    store = HistoryStore(args.db)
+    if args.command == "import":
+        files, rows = store.import_archives(args.directory)
+        print(f"Imported {rows} rows from {files} archives")
+    elif args.command == "velocity":
+        result = store.star_velocity(args.full_name, args.days)
+        if result is None:
+            print(f"No history for {args.full_name} in the last {args.days} days")
+        else:
+            print(f"{args.full_name}: +{result['stars_gained']} stars ({result['stars_per_day']}/day) "
+                  f"{result['first_date']} .. {result['last_date']}")
+    else:
+        for index, repo in enumerate(store.top_risers(args.days, args.limit), 1):
+            print(f"{index:>2}. {repo['full_name']:<50} +{repo['stars_gained']:<6} ({repo['start_stars']} -> {repo['stars']})")
+
+if __name__ == "__main__":
+    main()
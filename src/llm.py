@@ -1,105 +1,501 @@
 import os
+import re
+import json
+import time
 import logging
-from openai import OpenAI
+from concurrent.futures import ThreadPoolExecutor
+from llm_cache import LLMResultCache
+from llm_metrics import LLMMetrics
+from llm_router import LLMBackend, LLMRouter
 
 logger = logging.getLogger(__name__)
 
 class LLMAnalyzer:
     def __init__(self):
-        # Prioritize Local Ollama
-        self.use_local = True
-        self.local_base_url = "http://localhost:11434/v1"
-        self.local_model = "llama3.2:3b"
+        # Local Ollama
+        self.local_base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434/v1")
+        self.local_model = os.getenv("OLLAMA_MODEL", "llama3.2:3b")
         
-        # Fallback to OpenAI if configured (though we prefer local now)
+        # OpenAI-compatible remote, used if an API key is configured
         self.api_key = os.getenv("OPENAI_API_KEY")
         self.remote_base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
         self.remote_model = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
         
-        if self.use_local:
-            logger.info(f"Using Local LLM: {self.local_model}")
-            self.client = OpenAI(api_key="ollama", base_url=self.local_base_url)
-            self.model = self.local_model
-        elif self.api_key:
-            self.client = OpenAI(api_key=self.api_key, base_url=self.remote_base_url)
-            self.model = self.remote_model
+        # Concurrency for batch analysis and per-call timeout (seconds)
+        self.max_workers = int(os.getenv("LLM_MAX_WORKERS", "4"))
+        self.timeout = float(os.getenv("LLM_TIMEOUT", "60"))
+        # Repos packed into one prompt by analyze_repos (1 = one call per repo)
+        self.batch_size = int(os.getenv("LLM_BATCH_SIZE", "1"))
+        
+        # Persistent memo so unchanged repos never hit the model twice
+        self.cache = LLMResultCache(
+            db_path=os.getenv("LLM_CACHE_PATH", "data/llm_cache.db"),
+            ttl_seconds=int(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+        )
+        # Tokens, latency and fallbacks per call kind (served at /api/metrics)
+        self.metrics = LLMMetrics(log_file=os.getenv("LLM_METRICS_LOG", "data/llm_metrics.log"))
+        
+        # Calls go to the first healthy backend and fail over down the list
+        self.router = self._build_router()
+        if self.router:
+            logger.info(f"LLM backends: {', '.join(f'{b.name} ({b.model})' for b in self.router.backends)}")
+            # Cache keys use the primary model, so a failover answer is reused too
+            self.model = self.router.backends[0].model
         else:
-            self.client = None
+            self.model = None
             logger.warning("No LLM configuration found. AI analysis will be skipped.")
 
+    def _build_router(self):
+        """
+        Backends from LLM_BACKENDS, in failover order ('local,remote' by default).
+        'remote' is skipped without OPENAI_API_KEY.
+        """
+        # The router fails over instead, so client-side retries would only delay it
+        max_retries = int(os.getenv("LLM_MAX_RETRIES", "1"))
+        backends = []
+        for name in os.getenv("LLM_BACKENDS", "local,remote").split(","):
+            name = name.strip()
+            if name == "local":
+                backends.append(LLMBackend("local", self.local_base_url, "ollama", self.local_model,
+                                           self.timeout, max_retries))
+            elif name == "remote" and self.api_key:
+                backends.append(LLMBackend("remote", self.remote_base_url, self.api_key, self.remote_model,
+                                           self.timeout, max_retries))
+            elif name and name != "remote":
+                logger.warning(f"Unknown LLM backend '{name}' in LLM_BACKENDS")
+        return LLMRouter(
+            backends,
+            strategy=os.getenv("LLM_ROUTING", "priority"),
+            failure_threshold=int(os.getenv("LLM_BREAKER_THRESHOLD", "3")),
+            cooldown=float(os.getenv("LLM_BREAKER_COOLDOWN", "30"))
+        )
+
     def analyze_repo(self, name, description, language):
         """
         Analyze the repository using LLM.
         """
-        if not self.client:
+        if not self.router:
+            self.metrics.record_fallback("analyze_repo")
+            return self._fallback_analysis(name, description, language)
+
+        try:
+            return self._chat(**self._analyze_repo_request(name, description, language))
+        except Exception as e:
+            logger.error(f"LLM analysis failed for {name}: {e}")
+            self.metrics.record_fallback("analyze_repo")
             return self._fallback_analysis(name, description, language)
 
+    def analyze_repos(self, repos, max_workers=None, batch_size=None):
+        """
+        Analyze a list of repositories concurrently.
+        Sets repo['ai_analysis'] on every repo, keeping the input order.
+        With batch_size > 1 (default LLM_BATCH_SIZE) repos are packed into shared prompts.
+        """
+        if not repos:
+            return repos
+
+        batch_size = batch_size or self.batch_size
+        if batch_size > 1 and self.router:
+            return self._analyze_repos_batched(repos, batch_size, max_workers)
+
+        workers = max(1, min(max_workers or self.max_workers, len(repos)))
+        durations = [0.0] * len(repos)
+
+        def analyze(index):
+            repo = repos[index]
+            started = time.perf_counter()
+            analysis = self.analyze_repo(repo['name'], repo['description'], repo['language'])
+            durations[index] = time.perf_counter() - started
+            return analysis
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # map() yields results in submission order, so repos stay ranked
+            for repo, analysis in zip(repos, executor.map(analyze, range(len(repos)))):
+                repo['ai_analysis'] = analysis
+        elapsed = time.perf_counter() - started
+
+        # The serial loop would have taken roughly the sum of all call durations
+        serial = sum(durations)
+        speedup = serial / elapsed if elapsed > 0 else 1.0
+        logger.info(
+            f"Analyzed {len(repos)} repos with {workers} workers in {elapsed:.1f}s "
+            f"(serial estimate {serial:.1f}s, speedup x{speedup:.1f})"
+        )
+        logger.info(f"LLM cache: {self.cache.stats()}")
+        return repos
+
+    def analyze_repo_batch(self, repos):
+        """
+        Analyze several repositories with one structured prompt.
+        Returns analyses in input order; any repo missing from or malformed in
+        the model's JSON answer is analyzed on its own with analyze_repo().
+        """
+        if not repos:
+            return []
+
+        try:
+            summaries, tokens = self._chat_batch(repos)
+        except Exception as e:
+            logger.error(f"Batch analysis of {len(repos)} repos failed: {e}")
+            summaries, tokens = {}, 0
+
+        results = []
+        for number, repo in enumerate(repos, 1):
+            summary = summaries.get(number)
+            if summary:
+                key = self.cache.make_key(self.model, "analyze_repo", repo['name'], repo['description'], repo['language'])
+                self.cache.set(key, "analyze_repo", summary, tokens // len(repos))
+                results.append(summary)
+            else:
+                logger.warning(f"No valid batch result for {repo['name']}, analyzing it separately")
+                self.metrics.record_fallback("analyze_repo_batch")
+                results.append(self.analyze_repo(repo['name'], repo['description'], repo['language']))
+        return results
+
+    def _analyze_repos_batched(self, repos, batch_size, max_workers=None):
+        started = time.perf_counter()
+        analyses = [None] * len(repos)
+
+        # Only repos missing from the LLM cache go into batches
+        pending = []
+        for index, repo in enumerate(repos):
+            key = self.cache.make_key(self.model, "analyze_repo", repo['name'], repo['description'], repo['language'])
+            cached = self.cache.get(key)
+            if cached is not None:
+                analyses[index] = cached
+            else:
+                pending.append(index)
+
+        batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+        if batches:
+            workers = max(1, min(max_workers or self.max_workers, len(batches)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = executor.map(lambda batch: self.analyze_repo_batch([repos[i] for i in batch]), batches)
+                for batch, batch_results in zip(batches, results):
+                    for index, analysis in zip(batch, batch_results):
+                        analyses[index] = analysis
+
+        for repo, analysis in zip(repos, analyses):
+            repo['ai_analysis'] = analysis
+        logger.info(
+            f"Analyzed {len(repos)} repos in {len(batches)} batches of up to {batch_size} "
+            f"in {time.perf_counter() - started:.1f}s ({len(repos) - len(pending)} from cache)"
+        )
+        return repos
+
+    def _chat_batch(self, repos):
+        """
+        One completion for all repos. Returns ({1-based number: summary}, total tokens).
+        """
+        listing = "\n".join(
+            f"[{number}] Name: {repo['name']} | Language: {repo['language']} | Description: {repo['description']}"
+            for number, repo in enumerate(repos, 1)
+        )
         prompt = f"""
-        You are a tech trend analyst. Analyze this GitHub repository:
-        Name: {name}
-        Language: {language}
-        Description: {description}
+        You are a tech trend analyst. Analyze each of these GitHub repositories:
+        {listing}
         
-        Provide a concise, engaging summary (in Chinese) explaining:
+        For EVERY repository, write a concise, engaging summary (in Chinese) explaining:
         1. What does it do?
         2. Why is it useful/interesting?
         3. Who is it for?
         
-        Keep it under 100 words. Return ONLY the summary text.
+        Keep each summary under 100 words.
+        Return ONLY a JSON object with one entry per repository, using its number as id:
+        {{"results": [{{"id": 1, "summary": "..."}}, {{"id": 2, "summary": "..."}}]}}
         """
 
+        response = self._create(
+            "analyze_repo_batch",
+            messages=[
+                {"role": "system", "content": "You are a helpful assistant that answers in JSON."},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=200 * len(repos) + 50,
+            temperature=0.7,
+            response_format={"type": "json_object"}
+        )
+        content = response.choices[0].message.content
+        return self._parse_batch(content, len(repos)), self._total_tokens(response)
+
+    @staticmethod
+    def _parse_batch(content, count):
+        """
+        Validate the batch answer: {"results": [{"id": int, "summary": str}, ...]}.
+        Entries with an unknown id or an empty summary are dropped.
+        """
+        # Tolerate code fences or chatter around the JSON object
+        match = re.search(r'\{.*\}', content or '', re.DOTALL)
+        if not match:
+            return {}
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=200,
-                temperature=0.7
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            logger.error(f"LLM analysis failed for {name}: {e}")
-            return self._fallback_analysis(name, description, language)
+            data = json.loads(match.group(0))
+        except ValueError:
+            return {}
+
+        results = data.get('results') if isinstance(data, dict) else None
+        if not isinstance(results, list):
+            return {}
+
+        summaries = {}
+        for item in results:
+            if not isinstance(item, dict):
+                continue
+            try:
+                number = int(item.get('id'))
+            except (TypeError, ValueError):
+                continue
+            summary = item.get('summary')
+            if 1 <= number <= count and isinstance(summary, str) and summary.strip():
+                summaries[number] = summary.strip()
+        return summaries
 
     def translate(self, text, target_language):
         """
         Translate text to target language using LLM.
         """
-        if not self.client:
+        if not self.router:
+            self.metrics.record_fallback("translate")
             return text
 
-        prompt = f"""
-        Translate the following text to {target_language}. 
-        Keep the tone technical and professional. 
-        Return ONLY the translated text, no explanations.
-        
-        Text: "{text}"
+        try:
+            return self._chat(**self._translate_request(text, target_language))
+        except Exception as e:
+            logger.error(f"Translation failed: {e}")
+            self.metrics.record_fallback("translate")
+            return text
+
+    async def translate_async(self, text, target_language):
+        """
+        Async variant of translate() for the ASGI server.
         """
+        if not self.router:
+            self.metrics.record_fallback("translate")
+            return text
 
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a professional translator."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=500,
-                temperature=0.3
-            )
-            return response.choices[0].message.content.strip()
+            return await self._chat_async(**self._translate_request(text, target_language))
         except Exception as e:
             logger.error(f"Translation failed: {e}")
+            self.metrics.record_fallback("translate")
             return text
 
-    def expand_search_query(self, query):
+    def expand_search_query(self, query, raise_errors=False):
         """
         Expand search query into GitHub-friendly English keywords.
+        With raise_errors, a failed call raises instead of returning the query unchanged.
         """
-        if not self.client:
+        if not self.router:
+            self.metrics.record_fallback("expand_search_query")
+            return query
+
+        try:
+            content = self._chat(**self._expand_search_query_request(query))
+            return self._clean_search_query(content, query)
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"Query expansion failed: {e}")
+            self.metrics.record_fallback("expand_search_query")
             return query
 
+    async def expand_search_query_async(self, query, raise_errors=False):
+        """
+        Async variant of expand_search_query() for the ASGI server.
+        """
+        if not self.router:
+            self.metrics.record_fallback("expand_search_query")
+            return query
+
+        try:
+            content = await self._chat_async(**self._expand_search_query_request(query))
+            return self._clean_search_query(content, query)
+        except Exception as e:
+            if raise_errors:
+                raise
+            logger.error(f"Query expansion failed: {e}")
+            self.metrics.record_fallback("expand_search_query")
+            return query
+
+    def analyze_potential(self, name, description, language):
+        """
+        Analyze if a repo is a "Hidden Gem" (High potential, innovative, but low stars).
+        """
+        if not self.router:
+            self.metrics.record_fallback("analyze_potential")
+            return "Potential hidden gem."
+
+        try:
+            return self._chat(**self._analyze_potential_request(name, description, language))
+        except Exception as e:
+            logger.error(f"Potential analysis failed: {e}")
+            self.metrics.record_fallback("analyze_potential")
+            return "💎 发现亮点: 潜力项目 (AI暂不可用)"
+
+    async def analyze_potential_async(self, name, description, language):
+        """
+        Async variant of analyze_potential() for the ASGI server.
+        """
+        if not self.router:
+            self.metrics.record_fallback("analyze_potential")
+            return "Potential hidden gem."
+
+        try:
+            return await self._chat_async(**self._analyze_potential_request(name, description, language))
+        except Exception as e:
+            logger.error(f"Potential analysis failed: {e}")
+            self.metrics.record_fallback("analyze_potential")
+            return "💎 发现亮点: 潜力项目 (AI暂不可用)"
+
+    def analyze_repo_stream(self, name, description, language):
+        """
+        Streaming variant of analyze_repo(): yields text chunks as the model produces them.
+        """
+        if not self.router:
+            self.metrics.record_fallback("analyze_repo")
+            yield self._fallback_analysis(name, description, language)
+            return
+        yield from self._stream_with_fallback(
+            self._analyze_repo_request(name, description, language),
+            self._fallback_analysis(name, description, language),
+            f"LLM analysis failed for {name}"
+        )
+
+    def translate_stream(self, text, target_language):
+        """
+        Streaming variant of translate(): yields text chunks as the model produces them.
+        """
+        if not self.router:
+            self.metrics.record_fallback("translate")
+            yield text
+            return
+        yield from self._stream_with_fallback(
+            self._translate_request(text, target_language), text, "Translation failed"
+        )
+
+    def analyze_potential_stream(self, name, description, language):
+        """
+        Streaming variant of analyze_potential(): yields text chunks as the model produces them.
+        """
+        if not self.router:
+            self.metrics.record_fallback("analyze_potential")
+            yield "Potential hidden gem."
+            return
+        yield from self._stream_with_fallback(
+            self._analyze_potential_request(name, description, language),
+            "💎 发现亮点: 潜力项目 (AI暂不可用)",
+            "Potential analysis failed"
+        )
+
+    async def analyze_repo_stream_async(self, name, description, language):
+        """
+        Async variant of analyze_repo_stream() for the ASGI server.
+        """
+        if not self.router:
+            self.metrics.record_fallback("analyze_repo")
+            yield self._fallback_analysis(name, description, language)
+            return
+        async for chunk in self._stream_with_fallback_async(
+            self._analyze_repo_request(name, description, language),
+            self._fallback_analysis(name, description, language),
+            f"LLM analysis failed for {name}"
+        ):
+            yield chunk
+
+    async def translate_stream_async(self, text, target_language):
+        """
+        Async variant of translate_stream() for the ASGI server.
+        """
+        if not self.router:
+            self.metrics.record_fallback("translate")
+            yield text
+            return
+        async for chunk in self._stream_with_fallback_async(
+            self._translate_request(text, target_language), text, "Translation failed"
+        ):
+            yield chunk
+
+    async def analyze_potential_stream_async(self, name, description, language):
+        """
+        Async variant of analyze_potential_stream() for the ASGI server.
+        """
+        if not self.router:
+            self.metrics.record_fallback("analyze_potential")
+            yield "Potential hidden gem."
+            return
+        async for chunk in self._stream_with_fallback_async(
+            self._analyze_potential_request(name, description, language),
+            "💎 发现亮点: 潜力项目 (AI暂不可用)",
+            "Potential analysis failed"
+        ):
+            yield chunk
+
+    def _stream_with_fallback(self, request, fallback, error_message):
+        # Fall back only if nothing was sent yet; a half-streamed answer is kept as is
+        sent = False
+        try:
+            for chunk in self._chat_stream(**request):
+                sent = True
+                yield chunk
+        except Exception as e:
+            logger.error(f"{error_message}: {e}")
+            if not sent:
+                self.metrics.record_fallback(request["kind"])
+                yield fallback
+
+    async def _stream_with_fallback_async(self, request, fallback, error_message):
+        sent = False
+        try:
+            async for chunk in self._chat_stream_async(**request):
+                sent = True
+                yield chunk
+        except Exception as e:
+            logger.error(f"{error_message}: {e}")
+            if not sent:
+                self.metrics.record_fallback(request["kind"])
+                yield fallback
+
+    def _analyze_repo_request(self, name, description, language):
+        prompt = f"""
+        You are a tech trend analyst. Analyze this GitHub repository:
+        Name: {name}
+        Language: {language}
+        Description: {description}
+        
+        Provide a concise, engaging summary (in Chinese) explaining:
+        1. What does it do?
+        2. Why is it useful/interesting?
+        3. Who is it for?
+        
+        Keep it under 100 words. Return ONLY the summary text.
+        """
+        return {
+            "kind": "analyze_repo",
+            "system": "You are a helpful assistant.",
+            "prompt": prompt,
+            "max_tokens": 200,
+            "temperature": 0.7,
+            "cache_key": self.cache.make_key(self.model, "analyze_repo", name, description, language)
+        }
+
+    def _translate_request(self, text, target_language):
+        prompt = f"""
+        Translate the following text to {target_language}. 
+        Keep the tone technical and professional. 
+        Return ONLY the translated text, no explanations.
+        
+        Text: "{text}"
+        """
+        return {
+            "kind": "translate",
+            "system": "You are a professional translator.",
+            "prompt": prompt,
+            "max_tokens": 500,
+            "temperature": 0.3
+        }
+
+    def _expand_search_query_request(self, query):
         prompt = f"""
         User wants to search for GitHub repositories with this query: "{query}".
         
@@ -113,36 +509,24 @@ class LLMAnalyzer:
         Query: {query}
         Output:
         """
+        return {
+            "kind": "expand_search_query",
+            "system": "You are a smart search optimizer. Preserve proper nouns.",
+            "prompt": prompt,
+            "max_tokens": 50,
+            "temperature": 0.1
+        }
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": "You are a smart search optimizer. Preserve proper nouns."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=50,
-                temperature=0.1
-            )
-            content = response.choices[0].message.content.strip()
-            # Clean up potential quotes or extra text
-            content = content.replace('"', '').replace("'", "")
-            if "Here are" in content or "keywords" in content:
-                logger.warning(f"LLM returned verbose search query: {content}")
-                return query
-                
-            return content
-        except Exception as e:
-            logger.error(f"Query expansion failed: {e}")
+    def _clean_search_query(self, content, query):
+        # Clean up potential quotes or extra text
+        content = content.replace('"', '').replace("'", "")
+        if "Here are" in content or "keywords" in content:
+            logger.warning(f"LLM returned verbose search query: {content}")
             return query
 
-    def analyze_potential(self, name, description, language):
-        """
-        Analyze if a repo is a "Hidden Gem" (High potential, innovative, but low stars).
-        """
-        if not self.client:
-            return "Potential hidden gem."
+        return content
 
+    def _analyze_potential_request(self, name, description, language):
         prompt = f"""
         Analyze this small GitHub project to see if it's a "Hidden Gem" (innovative/useful but underrated).
         
@@ -154,21 +538,225 @@ class LLMAnalyzer:
         Start with "💎 发现亮点: "
         If it seems generic/useless, just say "普通项目".
         """
+        return {
+            "kind": "analyze_potential",
+            "system": "You are a tech scout looking for hidden gems.",
+            "prompt": prompt,
+            "max_tokens": 100,
+            "temperature": 0.5,
+            "cache_key": self.cache.make_key(self.model, "analyze_potential", name, description, language)
+        }
+
+    def _chat(self, kind, system, prompt, max_tokens, temperature, cache_key=None):
+        """
+        Run one chat completion and return the stripped text.
+        Results with a cache_key are served from and stored in the LLM cache.
+        Raises on any client error so callers can pick their own fallback.
+        """
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.metrics.record(kind, "cache", "cached")
+                return cached
+
+        response = self._create(
+            kind,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        result = response.choices[0].message.content.strip()
+        if cache_key:
+            self.cache.set(cache_key, kind, result, self._total_tokens(response))
+        return result
+
+    def _chat_stream(self, kind, system, prompt, max_tokens, temperature, cache_key=None):
+        """
+        Streaming variant of _chat(): yields content deltas with stream=True.
+        A cached result is yielded in one piece; a completed stream is cached.
+        """
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.metrics.record(kind, "cache", "cached")
+                yield cached
+                return
 
+        # Failover happens while opening the stream; once text was sent, errors propagate
+        backend, stream = self.router.call(lambda backend: (backend, self._open_stream(
+            backend, kind,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature
+        )))
+
+        started = time.perf_counter()
+        usage = None
+        parts = []
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
+            for chunk in stream:
+                usage = getattr(chunk, 'usage', None) or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                # Leading whitespace is stripped in the non-streaming path too
+                if not parts:
+                    delta = delta.lstrip()
+                    if not delta:
+                        continue
+                parts.append(delta)
+                yield delta
+        except Exception as e:
+            self.metrics.record(kind, backend.name, "error", time.perf_counter() - started)
+            self.router.record_failure(backend, e)
+            raise
+        self.metrics.record(kind, backend.name, "ok", time.perf_counter() - started, *self._usage(usage))
+        if cache_key and parts:
+            self.cache.set(cache_key, kind, "".join(parts).strip(), getattr(usage, 'total_tokens', 0) or 0)
+
+    async def _chat_stream_async(self, kind, system, prompt, max_tokens, temperature, cache_key=None):
+        """Async variant of _chat_stream() on the AsyncOpenAI clients; no thread waits for the first token."""
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.metrics.record(kind, "cache", "cached")
+                yield cached
+                return
+
+        async def attempt(backend):
+            return backend, await self._open_stream_async(
+                backend, kind,
                 messages=[
-                    {"role": "system", "content": "You are a tech scout looking for hidden gems."},
+                    {"role": "system", "content": system},
                     {"role": "user", "content": prompt}
                 ],
-                max_tokens=100,
-                temperature=0.5
+                max_tokens=max_tokens,
+                temperature=temperature
             )
-            return response.choices[0].message.content.strip()
+
+        # Failover happens while opening the stream; once text was sent, errors propagate
+        backend, stream = await self.router.call_async(attempt)
+
+        started = time.perf_counter()
+        usage = None
+        parts = []
+        try:
+            async for chunk in stream:
+                usage = getattr(chunk, 'usage', None) or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if not delta:
+                    continue
+                if not parts:
+                    delta = delta.lstrip()
+                    if not delta:
+                        continue
+                parts.append(delta)
+                yield delta
         except Exception as e:
-            logger.error(f"Potential analysis failed: {e}")
-            return "💎 发现亮点: 潜力项目 (AI暂不可用)"
+            self.metrics.record(kind, backend.name, "error", time.perf_counter() - started)
+            self.router.record_failure(backend, e)
+            raise
+        finally:
+            # Hands the connection back to the pool when the client went away mid-stream
+            await stream.close()
+        self.metrics.record(kind, backend.name, "ok", time.perf_counter() - started, *self._usage(usage))
+        if cache_key and parts:
+            self.cache.set(cache_key, kind, "".join(parts).strip(), getattr(usage, 'total_tokens', 0) or 0)
+
+    async def _chat_async(self, kind, system, prompt, max_tokens, temperature, cache_key=None):
+        """Async variant of _chat() using the AsyncOpenAI client."""
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                self.metrics.record(kind, "cache", "cached")
+                return cached
+
+        response = await self._create_async(
+            kind,
+            messages=[
+                {"role": "system", "content": system},
+                {"role": "user", "content": prompt}
+            ],
+            max_tokens=max_tokens,
+            temperature=temperature
+        )
+        result = response.choices[0].message.content.strip()
+        if cache_key:
+            self.cache.set(cache_key, kind, result, self._total_tokens(response))
+        return result
+
+    def _create(self, kind, **kwargs):
+        """Chat completion on the first healthy backend, recorded in self.metrics."""
+        def attempt(backend):
+            started = time.perf_counter()
+            try:
+                response = backend.client.chat.completions.create(model=backend.model, **kwargs)
+            except Exception:
+                self.metrics.record(kind, backend.name, "error", time.perf_counter() - started)
+                raise
+            self.metrics.record(kind, backend.name, "ok", time.perf_counter() - started,
+                                *self._usage(getattr(response, 'usage', None)))
+            return response
+
+        return self.router.call(attempt)
+
+    async def _create_async(self, kind, **kwargs):
+        """Async variant of _create() on the backends' AsyncOpenAI clients."""
+        async def attempt(backend):
+            started = time.perf_counter()
+            try:
+                response = await backend.async_client.chat.completions.create(model=backend.model, **kwargs)
+            except Exception:
+                self.metrics.record(kind, backend.name, "error", time.perf_counter() - started)
+                raise
+            self.metrics.record(kind, backend.name, "ok", time.perf_counter() - started,
+                                *self._usage(getattr(response, 'usage', None)))
+            return response
+
+        return await self.router.call_async(attempt)
+
+    def _open_stream(self, backend, kind, **kwargs):
+        started = time.perf_counter()
+        try:
+            return backend.client.chat.completions.create(
+                model=backend.model,
+                stream=True,
+                # Usage arrives in a final chunk without choices
+                stream_options={"include_usage": True},
+                **kwargs
+            )
+        except Exception:
+            self.metrics.record(kind, backend.name, "error", time.perf_counter() - started)
+            raise
+
+    async def _open_stream_async(self, backend, kind, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await backend.async_client.chat.completions.create(
+                model=backend.model,
+                stream=True,
+                stream_options={"include_usage": True},
+                **kwargs
+            )
+        except Exception:
+            self.metrics.record(kind, backend.name, "error", time.perf_counter() - started)
+            raise
+
+    @staticmethod
+    def _usage(usage):
+        """(prompt_tokens, completion_tokens) from a response's usage, 0 when missing."""
+        return (getattr(usage, 'prompt_tokens', 0) or 0, getattr(usage, 'completion_tokens', 0) or 0)
+
+    @staticmethod
+    def _total_tokens(response):
+        usage = getattr(response, 'usage', None)
+        return getattr(usage, 'total_tokens', 0) or 0
 
     def _fallback_analysis(self, name, description, language):
         """
@@ -0,0 +1,158 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+class LLMResultCache:
+    def __init__(self, db_path="data/llm_cache.db", ttl_seconds=7 * 24 * 3600, max_entries=5000,
+                 access_flush_size=100, access_flush_interval=60):
+        """
+        Persistent memo for LLM completions, keyed by a hash of model + method + inputs.
+        The database is shared by the web server and the scheduler process, so it runs in WAL mode
+        and hits do not write: their access times are batched and flushed with the next write.
+        :param ttl_seconds: Entries older than this are treated as misses
+        :param max_entries: Least recently used entries are evicted beyond this size
+        :param access_flush_size: Flush pending access times once this many hits are buffered
+        :param access_flush_interval: ... or once the oldest buffered hit is this many seconds old
+        """
+        self.db_path = db_path
+        self._ttl = ttl_seconds
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> last access time not yet written to the database
+        self._pending_access = {}
+        self._pending_since = None
+        self._access_flush_size = access_flush_size
+        self._access_flush_interval = access_flush_interval
+
+        # Counters since process start
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+
+        dirname = os.path.dirname(self.db_path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+
+        # timeout: wait for the other process's write instead of failing with "database is locked"
+        self._conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_results (
+                key TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                result TEXT NOT NULL,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_results_access ON llm_results (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model, kind, *inputs):
+        """Content address for a call: identical model, method and inputs share a key."""
+        payload = json.dumps([model, kind, *inputs], ensure_ascii=False)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT result, tokens, created_at FROM llm_results WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                # A cache problem must only cost a fresh completion, never the result
+                logger.warning(f"LLM cache read failed: {e}")
+                row = None
+
+            # Expired rows are left for _evict(), so a read never writes
+            if row is None or now - row[2] >= self._ttl:
+                self.misses += 1
+                return None
+
+            self._pending_access[key] = now
+            if self._pending_since is None:
+                self._pending_since = now
+            if (len(self._pending_access) >= self._access_flush_size
+                    or now - self._pending_since >= self._access_flush_interval):
+                self._flush_access()
+            self.hits += 1
+            self.tokens_saved += row[1]
+            return row[0]
+
+    def set(self, key, kind, result, tokens=0):
+        now = time.time()
+        with self._lock:
+            self._pending_access.pop(key, None)
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_results (key, kind, result, tokens, created_at, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, kind, result, tokens, now, now)
+                )
+                self._write_access()
+                self._evict()
+                self._conn.commit()
+                self._clear_access()
+            except sqlite3.Error as e:
+                self._conn.rollback()
+                logger.warning(f"LLM cache write failed: {e}")
+
+    def flush(self):
+        """Write buffered access times now (e.g. before shutdown)."""
+        with self._lock:
+            self._flush_access()
+
+    def _flush_access(self):
+        try:
+            self._write_access()
+            self._conn.commit()
+            self._clear_access()
+        except sqlite3.Error as e:
+            # Access times only steer eviction; keep them buffered and try again with the next write
+            self._conn.rollback()
+            logger.warning(f"LLM cache access flush failed: {e}")
+
+    def _write_access(self):
+        if not self._pending_access:
+            return
+        self._conn.executemany(
+            "UPDATE llm_results SET last_access = ? WHERE key = ?",
+            [(accessed, key) for key, accessed in self._pending_access.items()]
+        )
+
+    def _clear_access(self):
+        self._pending_access.clear()
+        self._pending_since = None
+
+    def _evict(self):
+        """Drop expired entries, then the least recently used ones above max_entries."""
+        self._conn.execute("DELETE FROM llm_results WHERE created_at <= ?", (time.time() - self._ttl,))
+        count = self._conn.execute("SELECT COUNT(*) FROM llm_results").fetchone()[0]
+        if count > self._max_entries:
+            self._conn.execute(
+                "DELETE FROM llm_results WHERE key IN "
+                "(SELECT key FROM llm_results ORDER BY last_access ASC LIMIT ?)",
+                (count - self._max_entries,)
+            )
+
+    def stats(self):
+        with self._lock:
+            size = self._conn.execute("SELECT COUNT(*) FROM llm_results").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+            "tokens_saved": self.tokens_saved,
+            "entries": size
+        }
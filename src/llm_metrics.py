@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import logging
+import threading
+from collections import deque
+from logging.handlers import RotatingFileHandler
+import metrics
+
+logger = logging.getLogger(__name__)
+
+LLM_REQUESTS = metrics.counter("llm_requests_total", "LLM calls by kind, backend and status (ok, error, cached)", ["kind", "backend", "status"])
+LLM_SECONDS = metrics.histogram("llm_request_duration_seconds", "LLM call latency, cache hits excluded", ["kind", "backend"])
+LLM_TOKENS = metrics.counter("llm_tokens_total", "Tokens reported by LLM backends", ["kind", "type"])
+LLM_FALLBACKS = metrics.counter("llm_fallbacks_total", "Answers replaced by fallback text", ["kind"])
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 5, 10, 30, 60)
+
+class LLMMetrics:
+    def __init__(self, log_file="data/llm_metrics.log", window_seconds=3600, max_bytes=1024 * 1024, backup_count=3):
+        """
+        Token, latency and outcome accounting for LLM calls.
+        Every call is appended as a JSON line to a rotating log file.
+        :param window_seconds: Length of the rolling window reported next to the totals
+        """
+        self.window_seconds = window_seconds
+        self.started_at = time.time()
+        self._kinds = {}
+        self._window = deque()
+        self._lock = threading.Lock()
+        self._log = self._open_log(log_file, max_bytes, backup_count) if log_file else None
+
+    def _open_log(self, log_file, max_bytes, backup_count):
+        call_logger = logging.getLogger(f"llm_metrics.{log_file}")
+        call_logger.propagate = False
+        call_logger.setLevel(logging.INFO)
+        if not call_logger.handlers:
+            try:
+                dirname = os.path.dirname(log_file)
+                if dirname:
+                    os.makedirs(dirname, exist_ok=True)
+                handler = RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                call_logger.addHandler(handler)
+            except OSError as e:
+                logger.error(f"Failed to open LLM metrics log {log_file}: {e}")
+                return None
+        return call_logger
+
+    def record(self, kind, backend, status, latency=0.0, prompt_tokens=0, completion_tokens=0):
+        """
+        Record one call.
+        :param status: 'ok', 'error' (the backend call raised) or 'cached' (served from the LLM cache)
+        """
+        now = time.time()
+        with self._lock:
+            stats = self._kind(kind)
+            stats["calls"] += 1
+            stats[status] = stats.get(status, 0) + 1
+            stats["backends"][backend] = stats["backends"].get(backend, 0) + 1
+            if status != "cached":
+                stats["prompt_tokens"] += prompt_tokens
+                stats["completion_tokens"] += completion_tokens
+                stats["latency_sum"] += latency
+                stats["latency_buckets"][self._bucket(latency)] += 1
+            self._window.append((now, kind, status, prompt_tokens, completion_tokens, latency))
+            self._trim(now)
+
+        LLM_REQUESTS.inc(kind=kind, backend=backend, status=status)
+        if status != "cached":
+            LLM_SECONDS.observe(latency, kind=kind, backend=backend)
+            LLM_TOKENS.inc(prompt_tokens, kind=kind, type="prompt")
+            LLM_TOKENS.inc(completion_tokens, kind=kind, type="completion")
+
+        if self._log:
+            self._log.info(json.dumps({
+                "ts": round(now, 3),
+                "kind": kind,
+                "backend": backend,
+                "status": status,
+                "latency": round(latency, 3),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens
+            }))
+
+    def record_fallback(self, kind, count=1):
+        """Count answers replaced by fallback text (no client, or the call failed)."""
+        with self._lock:
+            self._kind(kind)["fallbacks"] += count
+        LLM_FALLBACKS.inc(count, kind=kind)
+
+    def snapshot(self):
+        """Totals per call kind since start, plus token and latency sums over the rolling window."""
+        now = time.time()
+        with self._lock:
+            self._trim(now)
+            kinds = {}
+            for kind, stats in self._kinds.items():
+                timed = sum(stats["latency_buckets"])
+                kinds[kind] = {
+                    **{key: value for key, value in stats.items() if key not in ("latency_buckets", "backends")},
+                    "backends": dict(stats["backends"]),
+                    "avg_latency": round(stats["latency_sum"] / timed, 3) if timed else None,
+                    "latency_histogram": self._histogram(stats["latency_buckets"])
+                }
+                kinds[kind]["latency_sum"] = round(stats["latency_sum"], 3)
+
+            window = {}
+            for _, kind, status, prompt_tokens, completion_tokens, latency in self._window:
+                entry = window.setdefault(kind, {"calls": 0, "cached": 0, "error": 0,
+                                                 "prompt_tokens": 0, "completion_tokens": 0, "latency_sum": 0.0})
+                entry["calls"] += 1
+                entry["cached"] += int(status == "cached")
+                entry["error"] += int(status == "error")
+                entry["prompt_tokens"] += prompt_tokens
+                entry["completion_tokens"] += completion_tokens
+                entry["latency_sum"] = round(entry["latency_sum"] + latency, 3)
+
+        return {
+            "since": self.started_at,
+            "window_seconds": self.window_seconds,
+            "kinds": kinds,
+            "window": window,
+            "totals": {
+                "calls": sum(stats["calls"] for stats in kinds.values()),
+                "prompt_tokens": sum(stats["prompt_tokens"] for stats in kinds.values()),
+                "completion_tokens": sum(stats["completion_tokens"] for stats in kinds.values()),
+                "errors": sum(stats["error"] for stats in kinds.values()),
+                "fallbacks": sum(stats["fallbacks"] for stats in kinds.values())
+            }
+        }
+
+    def _kind(self, kind):
+        stats = self._kinds.get(kind)
+        if stats is None:
+            stats = {
+                "calls": 0, "ok": 0, "cached": 0, "error": 0, "fallbacks": 0,
+                "prompt_tokens": 0, "completion_tokens": 0, "latency_sum": 0.0,
+                "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+                "backends": {}
+            }
+            self._kinds[kind] = stats
+        return stats
+
+    def _trim(self, now):
+        while self._window and self._window[0][0] < now - self.window_seconds:
+            self._window.popleft()
+
+    @staticmethod
+    def _bucket(latency):
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if latency <= bound:
+                return index
+        return len(LATENCY_BUCKETS)
+
+    @staticmethod
+    def _histogram(buckets):
+        labels = [f"<={bound}s" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}s"]
+        return dict(zip(labels, buckets))
@@ -0,0 +1,159 @@
+import time
+import logging
+import threading
+from collections import deque
+from openai import OpenAI, AsyncOpenAI
+import metrics
+
+logger = logging.getLogger(__name__)
+
+CIRCUIT_OPEN = metrics.gauge("llm_backend_circuit_open", "1 while a backend's circuit breaker is open", ["backend"])
+
+class NoBackendAvailable(Exception):
+    """Every LLM backend has an open circuit breaker."""
+
+class LLMBackend:
+    def __init__(self, name, base_url, api_key, model, timeout=60, max_retries=1, window=20):
+        """
+        One OpenAI-compatible endpoint (local Ollama or a remote API).
+        :param window: Number of recent calls used for the rolling latency and error rate
+        """
+        self.name = name
+        self.base_url = base_url
+        self.model = model
+        self.client = OpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=max_retries)
+        # async_client serves the ASGI server (asgi_server.py)
+        self.async_client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=max_retries)
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def avg_latency(self):
+        return sum(self.latencies) / len(self.latencies) if self.latencies else 0.0
+
+    def error_rate(self):
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def stats(self):
+        return {
+            "model": self.model,
+            "base_url": self.base_url,
+            "state": "open" if self.is_open else "closed",
+            "avg_latency": round(self.avg_latency(), 3),
+            "error_rate": round(self.error_rate(), 3),
+            "consecutive_failures": self.consecutive_failures
+        }
+
+class LLMRouter:
+    def __init__(self, backends, strategy="priority", failure_threshold=3, cooldown=30, probe_timeout=5):
+        """
+        Sends each call to the first healthy backend and fails over to the next on error.
+        :param strategy: 'priority' keeps the configured order, 'latency' tries the fastest backend first
+        :param failure_threshold: Consecutive failures that open a backend's circuit breaker
+        :param cooldown: Seconds before an open backend is probed in the background
+        """
+        self.backends = backends
+        self.strategy = strategy
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.probe_timeout = probe_timeout
+        self._lock = threading.Lock()
+
+    def __bool__(self):
+        return bool(self.backends)
+
+    def call(self, attempt):
+        """
+        Run attempt(backend) on healthy backends in order until one succeeds.
+        Raises the last error, or NoBackendAvailable without waiting if all circuits are open.
+        """
+        last_error = None
+        for backend in self._candidates():
+            started = time.perf_counter()
+            try:
+                result = attempt(backend)
+            except Exception as e:
+                self.record_failure(backend, e)
+                last_error = e
+                continue
+            self.record_success(backend, time.perf_counter() - started)
+            return result
+        raise last_error or NoBackendAvailable("All LLM backends are unavailable")
+
+    async def call_async(self, attempt):
+        """Async variant of call(); attempt(backend) returns an awaitable."""
+        last_error = None
+        for backend in self._candidates():
+            started = time.perf_counter()
+            try:
+                result = await attempt(backend)
+            except Exception as e:
+                self.record_failure(backend, e)
+                last_error = e
+                continue
+            self.record_success(backend, time.perf_counter() - started)
+            return result
+        raise last_error or NoBackendAvailable("All LLM backends are unavailable")
+
+    def record_success(self, backend, latency):
+        with self._lock:
+            backend.latencies.append(latency)
+            backend.outcomes.append(True)
+            backend.consecutive_failures = 0
+            if backend.is_open:
+                logger.info(f"LLM backend {backend.name} recovered")
+            backend.opened_at = None
+        CIRCUIT_OPEN.set(0, backend=backend.name)
+
+    def record_failure(self, backend, error):
+        with self._lock:
+            backend.outcomes.append(False)
+            backend.consecutive_failures += 1
+            if not backend.is_open and backend.consecutive_failures >= self.failure_threshold:
+                backend.opened_at = time.time()
+                logger.warning(f"LLM backend {backend.name} failed {backend.consecutive_failures} times, "
+                               f"opening circuit for {self.cooldown}s: {error}")
+                CIRCUIT_OPEN.set(1, backend=backend.name)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "strategy": self.strategy,
+                "backends": {backend.name: backend.stats() for backend in self.backends}
+            }
+
+    def _candidates(self):
+        now = time.time()
+        with self._lock:
+            healthy = []
+            for backend in self.backends:
+                if not backend.is_open:
+                    healthy.append(backend)
+                elif now - backend.opened_at >= self.cooldown and not backend.probing:
+                    # Callers keep skipping the backend; a cheap request decides when it is back
+                    backend.probing = True
+                    threading.Thread(target=self._probe, args=(backend,), daemon=True).start()
+        if self.strategy == "latency":
+            # Backends without samples yet sort first so they get measured
+            healthy.sort(key=lambda backend: backend.avg_latency())
+        return healthy
+
+    def _probe(self, backend):
+        started = time.perf_counter()
+        try:
+            backend.client.with_options(timeout=self.probe_timeout, max_retries=0).models.list()
+        except Exception as e:
+            with self._lock:
+                backend.opened_at = time.time()
+                backend.probing = False
+            logger.info(f"LLM backend {backend.name} still unavailable: {e}")
+            return
+        with self._lock:
+            backend.probing = False
+        self.record_success(backend, time.perf_counter() - started)
@@ -0,0 +1,72 @@
+# Concurrent load test for the dashboard servers.
+#
+# Start the servers on different ports, then compare them, e.g.:
+#     python src/web_server.py                               # Flask, :5001
+#     uvicorn asgi_server:app --app-dir src --port 5002      # ASGI
+#     python src/load_test.py http://localhost:5001 http://localhost:5002 -c 200 -n 2000
+import time
+import asyncio
+import argparse
+import statistics
+import httpx
+
+async def run_load(base_url, path, concurrency, total):
+    latencies = []
+    errors = 0
+    queue = asyncio.Queue()
+    for _ in range(total):
+        queue.put_nowait(None)
+
+    async def worker(client):
+        nonlocal errors
+        while True:
+            try:
+                queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                response = await client.get(path)
+                if response.status_code >= 400:
+                    errors += 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    return {
+        "url": base_url + path,
+        "requests": total,
+        "errors": errors,
+        "rps": total / elapsed,
+        "p50_ms": percentile(0.50),
+        "p95_ms": percentile(0.95),
+        "p99_ms": percentile(0.99),
+        "mean_ms": statistics.mean(latencies) * 1000
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare dashboard servers under concurrent load.")
+    parser.add_argument("base_urls", nargs="+", help="Server base URLs, e.g. http://localhost:5001")
+    parser.add_argument("-p", "--path", default="/api/trending", help="Path to request")
+    parser.add_argument("-c", "--concurrency", type=int, default=100, help="Concurrent users")
+    parser.add_argument("-n", "--requests", type=int, default=1000, help="Total requests per server")
+    args = parser.parse_args()
+
+    print(f"{'server':<45} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'errors':>7}")
+    for base_url in args.base_urls:
+        result = asyncio.run(run_load(base_url.rstrip('/'), args.path, args.concurrency, args.requests))
+        print(f"{result['url']:<45} {result['rps']:>8.1f} {result['p50_ms']:>7.1f}ms "
+              f"{result['p95_ms']:>7.1f}ms {result['p99_ms']:>7.1f}ms {result['errors']:>7}")
+
+if __name__ == "__main__":
+    main()
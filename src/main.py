@@ -3,9 +3,10 @@ import logging
 from datetime import datetime
 from dotenv import load_dotenv
 
-from scraper import get_trending_repos
+from concurrent.futures import ThreadPoolExecutor
+from scraper import iter_trending_repos, SEARCH_PAGE_SIZE
 from llm import LLMAnalyzer
-from generator import generate_markdown, save_report
+from generator import ReportWriter, atomic_writer
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -22,25 +23,34 @@ def main():
     date_str = datetime.now().strftime('%Y-%m-%d')
     logger.info(f"Starting GitHub Trending job for {date_str} ({since})")
     
-    # 1. Fetch
-    repos = get_trending_repos(since=since, limit=limit)
+    # 1. Fetch and 2. Analyze, pipelined: each page of repos is analyzed
+    # while the following pages are still being fetched
+    analyzer = LLMAnalyzer()
+    repos = []
+    page = []
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        analyses = []
+        for repo in iter_trending_repos(since=since, limit=limit):
+            repos.append(repo)
+            page.append(repo)
+            if len(page) == SEARCH_PAGE_SIZE:
+                logger.info(f"Analyzing repos {len(repos) - len(page) + 1}-{len(repos)}...")
+                analyses.append(executor.submit(analyzer.analyze_repos, page))
+                page = []
+        if page:
+            logger.info(f"Analyzing repos {len(repos) - len(page) + 1}-{len(repos)}...")
+            analyses.append(executor.submit(analyzer.analyze_repos, page))
+        for analysis in analyses:
+            analysis.result()
+
     if not repos:
         logger.warning("No repositories found.")
         return
 
-    # 2. Analyze
-    analyzer = LLMAnalyzer()
-    for repo in repos:
-        logger.info(f"Analyzing {repo['name']}...")
-        analysis = analyzer.analyze_repo(repo['name'], repo['description'], repo['language'])
-        repo['ai_analysis'] = analysis
-
-    # 3. Generate Report
-    markdown_content = generate_markdown(repos, date_str, since)
-    
-    # 4. Save
+    # 3. Generate Report and 4. Save (streamed into a temp file that replaces the archive)
     filename = f"archives/{date_str}.md"
-    save_report(markdown_content, filename)
+    with atomic_writer(filename) as f:
+        ReportWriter(f).trending_header(date_str, since).trending_table(repos)
     logger.info(f"Report saved to {filename}")
     
     # Update README (Simple append for now, or just leave it)
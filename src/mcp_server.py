@@ -1,6 +1,7 @@
 from mcp.server.fastmcp import FastMCP
 from scraper import get_trending_repos, search_repos, search_hidden_gems
 from llm import LLMAnalyzer
+from repo_record import json_default
 import json
 
 # Initialize the MCP Server
@@ -18,7 +19,7 @@ def get_trending(since: str = "daily", language: str = "", limit: int = 10) -> s
         limit: Number of repositories to return. Defaults to 10.
     """
     repos = get_trending_repos(since=since, language=language, limit=limit)
-    return json.dumps(repos, indent=2)
+    return json.dumps(repos, indent=2, default=json_default)
 
 @mcp.tool()
 def search_github(query: str, limit: int = 10) -> str:
@@ -31,7 +32,7 @@ def search_github(query: str, limit: int = 10) -> str:
     """
     # Use the existing smart search logic
     repos = search_repos(query, limit=limit)
-    return json.dumps(repos, indent=2)
+    return json.dumps(repos, indent=2, default=json_default)
 
 @mcp.tool()
 def find_hidden_gems(limit: int = 5) -> str:
@@ -48,7 +49,7 @@ def find_hidden_gems(limit: int = 5) -> str:
     # For speed in MCP, we might skip the full LLM analysis loop here
     # or just return the raw data which is often enough for the calling Agent to analyze.
     
-    return json.dumps(gems, indent=2)
+    return json.dumps(gems, indent=2, default=json_default)
 
 @mcp.tool()
 def analyze_repo_potential(name: str, description: str, language: str) -> str:
@@ -0,0 +1,84 @@
+import gzip
+import hashlib
+import threading
+
+try:
+    import brotli # Optional: pip install brotli
+except ImportError:
+    brotli = None
+
+class Rendered:
+    __slots__ = ('version', 'etag', 'body', 'gzip', 'brotli')
+
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        # Compressed once here, so serving costs no CPU
+        self.gzip = gzip.compress(body, compresslevel=9)
+        self.brotli = brotli.compress(body, quality=11) if brotli else None
+
+class PrerenderCache:
+    def __init__(self):
+        """
+        Response bodies rendered once per data version and kept in memory with their
+        compressed variants. The version is any comparable value that changes whenever
+        the inputs of the body do (e.g. cache update timestamps).
+        """
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, name, version):
+        """The stored rendering of name if it was made for this version, else None."""
+        with self._lock:
+            entry = self._entries.get(name)
+        return entry if entry is not None and entry.version == version else None
+
+    def store(self, name, version, body):
+        entry = Rendered(version, body.encode('utf-8') if isinstance(body, str) else body)
+        with self._lock:
+            self._entries[name] = entry
+        return entry
+
+def negotiate(entry, if_none_match, accept_encoding):
+    """
+    Pick the encoding for a request and answer conditional requests.
+    Returns (status, body, headers); status is 304 with an empty body if the client's ETag still matches.
+    Each encoding gets its own strong ETag, as byte-identical responses require.
+    """
+    accepted = _accepted_encodings(accept_encoding)
+    if 'br' in accepted and entry.brotli is not None:
+        body, encoding = entry.brotli, 'br'
+    elif 'gzip' in accepted:
+        body, encoding = entry.gzip, 'gzip'
+    else:
+        body, encoding = entry.body, None
+
+    etag = f'"{entry.etag}-{encoding}"' if encoding else f'"{entry.etag}"'
+    headers = {
+        'ETag': etag,
+        'Vary': 'Accept-Encoding',
+        # Always revalidate; an unchanged page costs a 304 and no body
+        'Cache-Control': 'no-cache'
+    }
+    if _etag_matches(etag, if_none_match):
+        return 304, b'', headers
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return 200, body, headers
+
+def _accepted_encodings(header):
+    accepted = set()
+    for part in (header or '').split(','):
+        name, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if name and params not in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            accepted.add(name.strip().lower())
+    return accepted
+
+def _etag_matches(etag, header):
+    if not header:
+        return False
+    # If-None-Match uses weak comparison, so a W/ prefix still matches
+    tags = [tag.strip().removeprefix('W/') for tag in header.split(',')]
+    return '*' in tags or etag in tags
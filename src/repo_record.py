@@ -0,0 +1,96 @@
+class RepoRecord:
+    """
+    The slice of a GitHub Search API item that the dashboard, reports and MCP tools use.
+    Raw items carry ~80 fields (nested owner, dozens of *_url templates); records are
+    projected once at ingest and are what gets cached, persisted and sent to browsers.
+    Supports repo['field'] / repo.get('field') so code written against the raw dicts keeps working.
+    """
+    # Declared by hand rather than with @dataclass(slots=True), which needs Python 3.10
+    __slots__ = ('full_name', 'name', 'html_url', 'description', 'language', 'stargazers_count',
+                 'forks_count', 'topics', 'created_at', 'pushed_at', 'ai_analysis', 'gem_analysis')
+
+    def __init__(self, full_name, name, html_url, description=None, language=None, stargazers_count=0,
+                 forks_count=0, topics=None, created_at=None, pushed_at=None, ai_analysis=None, gem_analysis=None):
+        self.full_name = full_name
+        self.name = name
+        self.html_url = html_url
+        self.description = description
+        self.language = language
+        self.stargazers_count = stargazers_count
+        self.forks_count = forks_count
+        self.topics = topics if topics is not None else []
+        self.created_at = created_at
+        self.pushed_at = pushed_at
+        self.ai_analysis = ai_analysis
+        self.gem_analysis = gem_analysis
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"RepoRecord({fields})"
+
+    def __eq__(self, other):
+        if not isinstance(other, RepoRecord):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None
+
+    @classmethod
+    def from_api(cls, item):
+        return cls(
+            full_name=item.get('full_name') or item.get('name', ''),
+            name=item.get('name', ''),
+            html_url=item.get('html_url', ''),
+            description=item.get('description'),
+            language=item.get('language'),
+            stargazers_count=item.get('stargazers_count') or 0,
+            forks_count=item.get('forks_count') or 0,
+            topics=item.get('topics') or [],
+            created_at=item.get('created_at'),
+            pushed_at=item.get('pushed_at')
+        )
+
+    def to_dict(self):
+        """Compact JSON form; analyses are left out until they are set."""
+        data = {name: getattr(self, name) for name in _FIELDS}
+        if self.ai_analysis is not None:
+            data['ai_analysis'] = self.ai_analysis
+        if self.gem_analysis is not None:
+            data['gem_analysis'] = self.gem_analysis
+        return data
+
+    # Mapping-style access, as on the raw API dicts
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        try:
+            setattr(self, key, value)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __contains__(self, key):
+        return key in _ALL_FIELDS and getattr(self, key) is not None
+
+    def get(self, key, default=None):
+        value = getattr(self, key, None) if isinstance(key, str) else None
+        return default if value is None else value
+
+    def keys(self):
+        return self.to_dict().keys()
+
+_ALL_FIELDS = RepoRecord.__slots__
+_FIELDS = tuple(name for name in _ALL_FIELDS if name not in ('ai_analysis', 'gem_analysis'))
+
+def project_repos(items):
+    """Project raw Search API items to RepoRecords."""
+    return [RepoRecord.from_api(item) for item in items]
+
+def json_default(obj):
+    """default= hook for json.dumps that encodes RepoRecords compactly."""
+    if isinstance(obj, RepoRecord):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
@@ -0,0 +1,164 @@
+import os
+import json
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class Job:
+    def __init__(self, name, func, interval, jitter=0):
+        """
+        A periodic job.
+        :param interval: Seconds between runs, measured from the planned start (no drift)
+        :param jitter: Up to this many seconds are added to every planned start;
+                       the plan itself stays on the interval grid, so jitter never accumulates
+        """
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        self.next_run = 0.0
+        # Un-jittered start the next interval is measured from
+        self.planned = 0.0
+        self.last_run = None
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.last_duration = None
+        self.total_duration = 0.0
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "failures": self.failures,
+            "running": self.running,
+            "last_run": self.last_run,
+            "last_duration": self.last_duration,
+            "avg_duration": round(self.total_duration / self.runs, 2) if self.runs else None,
+            "next_run": self.next_run
+        }
+
+class Scheduler:
+    def __init__(self, max_concurrent=2, state_file="data/scheduler_state.json", tick=1.0):
+        """
+        Runs jobs on independent intervals with a shared concurrency budget.
+        :param max_concurrent: Max jobs running at the same time
+        :param state_file: Last run times are persisted here so missed runs are caught up after a restart
+        """
+        self.jobs = {}
+        self.max_concurrent = max_concurrent
+        self.state_file = state_file
+        self.tick = tick
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrent, thread_name_prefix="scheduler")
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._state = self._load_state()
+
+    def add_job(self, name, func, interval, jitter=0):
+        job = Job(name, func, interval, jitter)
+        last_run = self._state.get(name)
+        if last_run:
+            # Overdue jobs (e.g. missed while the service was down) run right away, once
+            job.last_run = last_run
+            job.planned = job.next_run = last_run + interval
+        self.jobs[name] = job
+        return job
+
+    def run_forever(self):
+        logger.info(f"Scheduler started with {len(self.jobs)} jobs, max {self.max_concurrent} concurrent")
+        while not self._stop.is_set():
+            self.run_pending()
+            self._stop.wait(self.tick)
+        self._executor.shutdown(wait=True)
+
+    def stop(self):
+        self._stop.set()
+
+    def run_pending(self):
+        now = time.time()
+        with self._lock:
+            running = sum(1 for job in self.jobs.values() if job.running)
+            # Most overdue first, so a full budget is spent where it is needed most
+            due = sorted(
+                (job for job in self.jobs.values() if not job.running and job.next_run <= now),
+                key=lambda job: job.next_run
+            )
+            for job in due[:max(0, self.max_concurrent - running)]:
+                job.running = True
+                self._executor.submit(self._run, job)
+
+    def _run(self, job):
+        started = time.time()
+        logger.info(f"Running job {job.name}")
+        try:
+            job.func()
+            failed = False
+        except Exception as e:
+            logger.error(f"Job {job.name} failed: {e}")
+            failed = True
+        duration = time.time() - started
+
+        with self._lock:
+            job.running = False
+            job.runs += 1
+            job.failures += int(failed)
+            job.last_run = started
+            job.last_duration = duration
+            job.total_duration += duration
+            job.planned = self._next_planned(job, started)
+            job.next_run = job.planned + random.uniform(0, job.jitter)
+            self._state[job.name] = started
+        self._save_state()
+        logger.info(f"Job {job.name} finished in {duration:.1f}s, next run at {time.strftime('%H:%M:%S', time.localtime(job.next_run))}")
+
+    def _next_planned(self, job, started):
+        planned = (job.planned or started) + job.interval
+        # Several intervals missed (long run, sleep): catch up with one run, not a burst
+        if planned <= time.time():
+            planned = time.time()
+        return planned
+
+    def stats(self):
+        with self._lock:
+            return {name: job.stats() for name, job in self.jobs.items()}
+
+    def log_stats(self):
+        """One log line per job: runs, failures, last run and its duration, next run."""
+        def clock(timestamp):
+            return time.strftime('%H:%M:%S', time.localtime(timestamp)) if timestamp else '-'
+
+        for name, stats in self.stats().items():
+            last_duration = f"{stats['last_duration']:.1f}s" if stats['last_duration'] is not None else '-'
+            avg_duration = f"{stats['avg_duration']}s" if stats['avg_duration'] is not None else '-'
+            logger.info(
+                f"Job {name}: {stats['runs']} runs, {stats['failures']} failed, "
+                f"last {clock(stats['last_run'])} ({last_duration}, avg {avg_duration}), "
+                f"next {clock(stats['next_run'])}{', running' if stats['running'] else ''}"
+            )
+
+    def _load_state(self):
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+            except Exception as e:
+                logger.error(f"Failed to load scheduler state: {e}")
+        return {}
+
+    def _save_state(self):
+        with self._lock:
+            state = dict(self._state)
+        try:
+            dirname = os.path.dirname(self.state_file)
+            if dirname:
+                os.makedirs(dirname, exist_ok=True)
+            tmp_file = f"{self.state_file}.tmp"
+            with open(tmp_file, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_file, self.state_file)
+        except Exception as e:
+            logger.error(f"Failed to save scheduler state: {e}")
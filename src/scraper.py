@@ -2,27 +2,37 @@ import os
 import requests
 from datetime import datetime, timedelta
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from github_client import get_client
+from repo_record import project_repos
+import metrics
 
 logger = logging.getLogger(__name__)
 
-from dotenv import load_dotenv
+REPOS_FETCHED = metrics.counter("scraper_repos_fetched_total", "Repositories returned by GitHub searches", ["source"])
+SCRAPER_ERRORS = metrics.counter("scraper_errors_total", "GitHub searches that failed and returned no repos", ["source"])
 
-# Load env vars at module level, but also allow dynamic reload
-load_dotenv()
+# The Search API pages at most 100 items and never returns more than 1000 results
+SEARCH_PAGE_SIZE = 100
+SEARCH_RESULT_CAP = 1000
 
-def get_token():
-    # Force reload to pick up changes from .env
-    load_dotenv(override=True)
-    return os.getenv("GITHUB_TOKEN")
-
-def get_trending_repos(since='daily', language='', limit=10):
+def get_trending_repos(since='daily', language='', limit=10, max_workers=None):
     """
     Fetch trending repositories from GitHub Search API.
     
     Args:
         since (str): 'daily', 'weekly', 'monthly'
         language (str): Programming language filter
-        limit (int): Number of repos to fetch
+        limit (int): Number of repos to fetch (up to 1000, fetched in pages)
+        max_workers (int): Max pages in flight (default SCRAPER_MAX_WORKERS or 4)
+    """
+    return list(iter_trending_repos(since, language, limit, max_workers))
+
+def iter_trending_repos(since='daily', language='', limit=10, max_workers=None):
+    """
+    Lazy variant of get_trending_repos(): yields repos in rank order as pages arrive.
+    Pages after the first are fetched concurrently; repos that move between pages
+    while paging (star counts change) are yielded once.
     """
     if since == 'daily':
         since_date = (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
@@ -37,39 +47,108 @@ def get_trending_repos(since='daily', language='', limit=10):
     if language:
         query += f' language:{language}'
 
-    url = "https://api.github.com/search/repositories"
+    limit = min(limit, SEARCH_RESULT_CAP)
+    if limit <= 0:
+        return
+    per_page = min(limit, SEARCH_PAGE_SIZE)
     params = {
         "q": query,
         "sort": "stars",
         "order": "desc",
-        "per_page": limit
+        "per_page": per_page
     }
     
-    headers = {
-        "Accept": "application/vnd.github.v3+json"
-    }
-    
-    # Add token if available to increase rate limit
-    token = get_token()
-    if token:
-        headers["Authorization"] = f"token {token}"
-
+    client = get_client()
     try:
         logger.info(f"Fetching trending repos with query: {query}")
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        return data.get("items", [])
+        data = client.get_json("/search/repositories", params=params)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error fetching data from GitHub: {e}")
-        return []
+        SCRAPER_ERRORS.inc(source="trending")
+        return
+
+    # No need to ask for pages past the last match
+    available = min(limit, data.get("total_count", 0))
+    pages = -(-available // per_page)
+    remaining, _ = client.rate_limit("search")
+    if remaining is not None and pages - 1 > remaining:
+        logger.warning(f"Only {remaining} search requests left, fetching {remaining + 1} of {pages} pages")
+        pages = remaining + 1
+
+    seen = set()
+    count = 0
+    for items in _trending_pages(client, params, data.get("items", []), pages, max_workers):
+        REPOS_FETCHED.inc(len(items), source="trending")
+        # Raw items are dropped right here, only the compact records travel on
+        for repo in project_repos(items):
+            if repo.get("full_name") in seen:
+                continue
+            seen.add(repo.get("full_name"))
+            yield repo
+            count += 1
+            if count >= limit:
+                return
+
+def _trending_pages(client, params, first_items, pages, max_workers):
+    """Yield item lists page by page, in order; stops at the first page that fails."""
+    yield first_items
+    if pages <= 1:
+        return
+
+    workers = max(1, min(max_workers or int(os.getenv("SCRAPER_MAX_WORKERS", "4")), pages - 1))
+    executor = ThreadPoolExecutor(max_workers=workers)
+    try:
+        futures = [
+            executor.submit(client.get_json, "/search/repositories", {**params, "page": page})
+            for page in range(2, pages + 1)
+        ]
+        for page, future in enumerate(futures, 2):
+            try:
+                data = future.result()
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Error fetching trending page {page}: {e}")
+                SCRAPER_ERRORS.inc(source="trending")
+                return
+            yield data.get("items", [])
+    finally:
+        # A caller that stops early should not wait for pages it will never read
+        executor.shutdown(wait=False, cancel_futures=True)
 
 def search_repos(query, limit=10):
     """
     Search repositories by keyword with smart filtering.
     """
-    url = "https://api.github.com/search/repositories"
+    params, final_query, sort_mode = _search_params(query, limit)
     
+    try:
+        logger.info(f"Searching repos with query: {final_query}, sort: {sort_mode}")
+        data = get_client().get_json("/search/repositories", params=params)
+        items = project_repos(data.get("items", []))
+        REPOS_FETCHED.inc(len(items), source="search")
+        return items
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error searching GitHub: {e}")
+        SCRAPER_ERRORS.inc(source="search")
+        return []
+
+async def search_repos_async(query, limit=10):
+    """
+    Async variant of search_repos() for the ASGI server.
+    """
+    params, final_query, sort_mode = _search_params(query, limit)
+    
+    try:
+        logger.info(f"Searching repos with query: {final_query}, sort: {sort_mode}")
+        data = await get_client().get_json_async("/search/repositories", params=params)
+        items = project_repos(data.get("items", []))
+        REPOS_FETCHED.inc(len(items), source="search")
+        return items
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Error searching GitHub: {e}")
+        SCRAPER_ERRORS.inc(source="search")
+        return []
+
+def _search_params(query, limit):
     # Improved Search Strategy:
     # 1. Don't force stars>100 if query is very specific (might be a new/niche project)
     # 2. But for generic queries, we want quality.
@@ -94,23 +173,7 @@ def search_repos(query, limit=10):
         params["sort"] = sort_mode
         params["order"] = "desc"
     
-    headers = {
-        "Accept": "application/vnd.github.v3+json"
-    }
-    
-    token = get_token()
-    if token:
-        headers["Authorization"] = f"token {token}"
-
-    try:
-        logger.info(f"Searching repos with query: {final_query}, sort: {sort_mode}")
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        return data.get("items", [])
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Error searching GitHub: {e}")
-        return []
+    return params, final_query, sort_mode
 
 def search_hidden_gems(limit=10):
     """
@@ -122,8 +185,6 @@ def search_hidden_gems(limit=10):
     - Size: < 50000 KB (Not huge monoliths)
     - Topics: creative, indie, tool, utility, automation (keywords to find useful tools)
     """
-    url = "https://api.github.com/search/repositories"
-    
     # Calculate date 7 days ago
     last_week = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d')
     
@@ -138,20 +199,13 @@ def search_hidden_gems(limit=10):
         "per_page": limit
     }
     
-    headers = {
-        "Accept": "application/vnd.github.v3+json"
-    }
-    
-    token = os.getenv("GITHUB_TOKEN")
-    if token:
-        headers["Authorization"] = f"token {token}"
-
     try:
         logger.info(f"Searching for hidden gems: {query}")
-        response = requests.get(url, params=params, headers=headers)
-        response.raise_for_status()
-        data = response.json()
-        return data.get("items", [])
+        data = get_client().get_json("/search/repositories", params=params)
+        items = project_repos(data.get("items", []))
+        REPOS_FETCHED.inc(len(items), source="hidden_gems")
+        return items
     except requests.exceptions.RequestException as e:
         logger.error(f"Error searching hidden gems: {e}")
+        SCRAPER_ERRORS.inc(source="hidden_gems")
         return []
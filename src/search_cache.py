@@ -0,0 +1,116 @@
+import os
+import copy
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive form of a search query, used as cache key."""
+    return " ".join(query.casefold().split())
+
+class LRUCache:
+    def __init__(self, max_entries, ttl_seconds):
+        """In-memory LRU with a per-entry TTL; expired entries count as misses."""
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry[1] >= self.ttl:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "entries": len(self._entries)
+            }
+
+class SearchCache:
+    def __init__(self, expansion_ttl=None, results_ttl=None, max_entries=None):
+        """
+        Two-level cache for /api/search:
+        normalized user query -> LLM-expanded query, and (normalized expanded query, limit) -> GitHub results.
+        :param expansion_ttl: Seconds an expansion is reused (default SEARCH_EXPANSION_TTL or 24 hours)
+        :param results_ttl: Seconds search results are reused (default SEARCH_RESULTS_TTL or 10 minutes)
+        :param max_entries: LRU bound of each level (default SEARCH_CACHE_SIZE or 1000)
+        """
+        expansion_ttl = expansion_ttl if expansion_ttl is not None else int(os.getenv("SEARCH_EXPANSION_TTL", "86400"))
+        results_ttl = results_ttl if results_ttl is not None else int(os.getenv("SEARCH_RESULTS_TTL", "600"))
+        max_entries = max_entries or int(os.getenv("SEARCH_CACHE_SIZE", "1000"))
+        self.expansions = LRUCache(max_entries, expansion_ttl)
+        self.results = LRUCache(max_entries, results_ttl)
+
+    def search(self, query, expand, search, limit=10):
+        """
+        Returns (expanded query, repos).
+        expand(query) must raise on failure so a fallback is never cached;
+        search(expanded, limit) returning [] (also its error result) is not cached either.
+        """
+        expanded = self.expansions.get(normalize_query(query))
+        if expanded is None:
+            try:
+                expanded = expand(query)
+                self.expansions.set(normalize_query(query), expanded)
+            except Exception as e:
+                logger.error(f"Query expansion failed: {e}")
+                expanded = query
+
+        results_key = (normalize_query(expanded), limit)
+        repos = self.results.get(results_key)
+        if repos is None:
+            repos = search(expanded, limit)
+            if repos:
+                self.results.set(results_key, repos)
+        return expanded, self._copy(repos)
+
+    async def search_async(self, query, expand, search, limit=10):
+        """Async variant of search(); expand and search return awaitables."""
+        expanded = self.expansions.get(normalize_query(query))
+        if expanded is None:
+            try:
+                expanded = await expand(query)
+                self.expansions.set(normalize_query(query), expanded)
+            except Exception as e:
+                logger.error(f"Query expansion failed: {e}")
+                expanded = query
+
+        results_key = (normalize_query(expanded), limit)
+        repos = self.results.get(results_key)
+        if repos is None:
+            repos = await search(expanded, limit)
+            if repos:
+                self.results.set(results_key, repos)
+        return expanded, self._copy(repos)
+
+    def stats(self):
+        return {"expansions": self.expansions.stats(), "results": self.results.stats()}
+
+    @staticmethod
+    def _copy(repos):
+        # Callers annotate the repo dicts; keep the cached ones untouched
+        return [copy.copy(repo) for repo in repos]
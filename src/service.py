@@ -1,9 +1,10 @@
-import time
 import logging
 import os
 from datetime import datetime
 from cache_manager import TrendingCache
-from generator import generate_markdown, generate_html, save_report
+from generator import ReportWriter, atomic_writer, save_report
+from history_store import HistoryStore
+from scheduler import Scheduler
 from dotenv import load_dotenv
 
 # Setup logging
@@ -17,44 +18,34 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def update_hourly(cache_manager):
+def update_hourly(cache_manager, force_refresh=True):
     """Fetch latest data and update TODAY.md and index.html"""
     logger.info("Running hourly update...")
     
     # 1. Fetch Trending (Global)
-    trending_data = cache_manager.get_data(since='daily', force_refresh=True)
+    trending_data = cache_manager.get_data(since='daily', force_refresh=force_refresh)
     
     # 2. Fetch VIP (Watchlist)
-    vip_data = cache_manager.get_vip_activities(force_refresh=True)
+    vip_data = cache_manager.get_vip_activities(force_refresh=force_refresh)
     
     date_str = datetime.now().strftime('%Y-%m-%d')
-    time_str = datetime.now().strftime('%H:%M')
     
-    # 3. Generate Markdown Report
-    content = f"# GitHub Daily Insight - {date_str}\n\n"
-    content += f"> 🔄 Last Updated: {time_str}\n\n"
-    
-    content += "## 🔥 Global Trending\n\n"
-    content += generate_markdown(trending_data, date_str, 'daily').split('\n', 4)[-1] # Reuse generator logic but skip header
-    
-    content += "\n\n## 👀 VIP Watchlist Activity\n\n"
-    if vip_data:
-        for act in vip_data:
-            icon = "⭐️" if act['type'] == 'star' else "🆕"
-            content += f"- {icon} **{act['user']}** {act['description']} [{act['repo_name']}]({act['repo_url']}) - *{act['time']}*\n"
-    else:
-        content += "*No recent activity from VIPs.*\n"
-        
-    save_report(content, "TODAY.md")
+    # 3. Generate Markdown Report (streamed section by section, replaced atomically)
+    with atomic_writer("TODAY.md") as f:
+        ReportWriter(f).today_header(date_str).trending_table(trending_data).vip_activity(vip_data)
     logger.info("Updated TODAY.md")
     
     # 4. Generate HTML Dashboard
-    html_content = generate_html(trending_data, vip_data, date_str)
-    save_report(html_content, "dashboard.html")
+    with atomic_writer("dashboard.html") as f:
+        ReportWriter(f).dashboard(trending_data, vip_data, date_str, watchlist=cache_manager.watchlist)
     logger.info("Updated dashboard.html")
+    return trending_data
 
-def archive_daily():
-    """Copy TODAY.md to archives/YYYY-MM-DD.md"""
+def archive_daily(history=None, repos=None):
+    """
+    Copy TODAY.md to archives/YYYY-MM-DD.md
+    :param history: HistoryStore that also gets the day's ranked snapshot of repos (the list in TODAY.md)
+    """
     date_str = datetime.now().strftime('%Y-%m-%d')
     archive_path = f"archives/{date_str}.md"
     
@@ -67,35 +58,67 @@ def archive_daily():
     else:
         logger.warning("No TODAY.md found to archive.")
 
+    if history is not None and repos:
+        count = history.record_snapshot(date_str, repos)
+        logger.info(f"Recorded {count} repos in trending history for {date_str}")
+
+def build_scheduler(cache_manager, history=None):
+    """
+    One job per data set, each on its own interval (seconds, overridable via env).
+    Weekly and monthly rankings move slowly, so they refresh less often than daily.
+    """
+    jitter = int(os.getenv("SCHEDULER_JITTER", "60"))
+    scheduler = Scheduler(max_concurrent=int(os.getenv("SCHEDULER_MAX_CONCURRENT", "2")))
+    
+    def interval(name, default):
+        return int(os.getenv(f"SCHEDULE_{name.upper()}", str(default)))
+    
+    # Each period refreshes all TRENDING_LANGUAGES lists together ("" = all languages),
+    # e.g. TRENDING_LANGUAGES=",Python,Rust" to keep per-language lists warm too
+    languages = [lang.strip() for lang in os.getenv("TRENDING_LANGUAGES", "").split(",")]
+    
+    def trending(since):
+        return lambda: cache_manager.refresh_trending([(since, lang) for lang in languages])
+    
+    # Reports are rendered right after the daily refresh, from the lists it just cached, so they
+    # never find the daily list expired and start a second fetch and LLM analysis of their own.
+    # Archive every time we update, overwriting the file, so the archive
+    # is always up to date with the latest fetch of that day.
+    def trending_daily_and_reports():
+        trending('daily')()
+        repos = update_hourly(cache_manager, force_refresh=False)
+        archive_daily(history, repos)
+    
+    scheduler.add_job("trending_daily", trending_daily_and_reports, interval("trending_daily", 3600), jitter)
+    scheduler.add_job("trending_weekly", trending('weekly'), interval("trending_weekly", 6 * 3600), jitter)
+    scheduler.add_job("trending_monthly", trending('monthly'), interval("trending_monthly", 24 * 3600), jitter)
+    scheduler.add_job("vip_activities", lambda: cache_manager.get_vip_activities(force_refresh=True),
+                      interval("vip_activities", 3600), jitter)
+    scheduler.add_job("hidden_gems", lambda: cache_manager.get_hidden_gems(force_refresh=True),
+                      interval("hidden_gems", 6 * 3600), jitter)
+    
+    # Per-job runs, failures and timings in service.log
+    scheduler.add_job("scheduler_stats", scheduler.log_stats, interval("scheduler_stats", 3600))
+    
+    return scheduler
+
 def main():
     load_dotenv()
     cache_manager = TrendingCache(ttl_seconds=3600)
+    history = HistoryStore(db_path=os.getenv("HISTORY_DB_PATH", "data/history.db"))
+    if history.is_empty():
+        # First run with the history store: backfill from the reports archived so far
+        history.import_archives("archives")
+    scheduler = build_scheduler(cache_manager, history)
     
     logger.info("Service started. Press Ctrl+C to stop.")
     
-    last_archive_date = None
-    
     try:
-        while True:
-            current_date = datetime.now().strftime('%Y-%m-%d')
-            
-            # 1. Hourly Update
-            update_hourly(cache_manager)
-            
-            # 2. Daily Archive (Check if it's a new day or near end of day)
-            # Simple logic: If current date != last archive date, and it's 23:xx, archive it.
-            # Or simpler: Archive every time we update, overwriting the file. 
-            # This ensures the archive is always up to date with the latest fetch of that day.
-            archive_daily()
-            
-            # Sleep for 1 hour
-            logger.info("Sleeping for 1 hour...")
-            time.sleep(3600)
-            
+        scheduler.run_forever()
     except KeyboardInterrupt:
+        scheduler.stop()
+        scheduler.log_stats()
         logger.info("Service stopped by user.")
-    except Exception as e:
-        logger.error(f"Service crashed: {e}")
 
 if __name__ == "__main__":
     main()
@@ -1,74 +1,168 @@
 import os
+import asyncio
 import requests
 import logging
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from github_client import get_client
+import metrics
 
 logger = logging.getLogger(__name__)
 
-def get_user_activities(usernames, limit=5):
+USER_FETCHES = metrics.counter("vip_user_fetches_total", "VIP event fetches by result (ok, rate_limited, http_error, error)", ["result"])
+
+# Stop issuing requests once this few core API calls remain in the window
+RATE_LIMIT_RESERVE = int(os.getenv("VIP_RATE_LIMIT_RESERVE", "10"))
+
+def get_user_activities(usernames, limit=5, max_workers=None):
     """
     Fetch recent relevant activities (Stars, Create) for a list of users.
     
     Args:
         usernames (list): List of GitHub usernames.
         limit (int): Max events per user.
+        max_workers (int): Max requests in flight (default VIP_MAX_WORKERS or 8).
         
     Returns:
         list: A consolidated list of interesting activities.
     """
     activities = []
-    
-    headers = {
-        "Accept": "application/vnd.github.v3+json"
-    }
-    token = os.getenv("GITHUB_TOKEN")
-    if token:
-        headers["Authorization"] = f"token {token}"
-
-    for user in usernames:
-        try:
-            url = f"https://api.github.com/users/{user}/events/public"
-            response = requests.get(url, headers=headers)
-            if response.status_code != 200:
-                logger.warning(f"Could not fetch events for {user}: {response.status_code}")
-                continue
-                
-            events = response.json()
-            
-            # Filter for interesting events: WatchEvent (Star), CreateEvent (New Repo)
-            user_events = []
-            for event in events[:limit*2]: # Fetch a bit more to filter
-                event_type = event.get('type')
-                repo_name = event.get('repo', {}).get('name')
-                created_at = event.get('created_at')
-                
-                if event_type == 'WatchEvent':
-                    user_events.append({
-                        'user': user,
-                        'type': 'star',
-                        'repo_name': repo_name,
-                        'repo_url': f"https://github.com/{repo_name}",
-                        'time': created_at,
-                        'description': f"starred {repo_name}"
-                    })
-                elif event_type == 'CreateEvent' and event.get('payload', {}).get('ref_type') == 'repository':
-                    user_events.append({
-                        'user': user,
-                        'type': 'create',
-                        'repo_name': repo_name,
-                        'repo_url': f"https://github.com/{repo_name}",
-                        'time': created_at,
-                        'description': f"created new repo {repo_name}"
-                    })
-                
-                if len(user_events) >= limit:
-                    break
-            
-            activities.extend(user_events)
-            
-        except Exception as e:
-            logger.error(f"Error processing user {user}: {e}")
+    for user_events, _ in _fetch_all(usernames, limit, {}, max_workers):
+        activities.extend(user_events or [])
 
     # Sort by time descending
     activities.sort(key=lambda x: x['time'], reverse=True)
     return activities
+
+def get_new_user_activities(usernames, cursors, limit=5, max_workers=None):
+    """
+    Fetch only activities newer than each user's cursor (last seen event id).
+    
+    Args:
+        usernames (list): List of GitHub usernames.
+        cursors (dict): username -> last seen event id.
+        limit (int): Max events per user.
+        max_workers (int): Max requests in flight.
+        
+    Returns:
+        dict: username -> (new activities, new cursor). Users whose fetch failed are omitted.
+    """
+    results = _fetch_all(usernames, limit, cursors, max_workers)
+    return {
+        user: result
+        for user, result in zip(usernames, results)
+        if result[0] is not None
+    }
+
+def _fetch_all(usernames, limit, cursors, max_workers):
+    if not usernames:
+        return []
+
+    client = get_client()
+    workers = max(1, min(max_workers or int(os.getenv("VIP_MAX_WORKERS", "8")), len(usernames)))
+
+    # Results come back in watchlist order, so merging them and sorting
+    # matches the serial loop exactly
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            lambda user: _fetch_user_events(client, user, limit, cursors.get(user)),
+            usernames
+        ))
+
+async def get_new_user_activities_async(usernames, cursors, limit=5, max_workers=None):
+    """
+    Async variant of get_new_user_activities() for the ASGI server.
+    """
+    client = get_client()
+    semaphore = asyncio.Semaphore(max(1, max_workers or int(os.getenv("VIP_MAX_WORKERS", "8"))))
+
+    async def fetch(user):
+        async with semaphore:
+            since_id = cursors.get(user)
+            if _rate_limited(client, user):
+                return None, since_id
+            try:
+                events = await client.get_json_async(f"/users/{user}/events/public")
+                USER_FETCHES.inc(result="ok")
+                return _filter_events(user, events, limit, since_id)
+            except requests.exceptions.HTTPError as e:
+                logger.warning(f"Could not fetch events for {user}: {e.response.status_code}")
+                USER_FETCHES.inc(result="http_error")
+            except Exception as e:
+                logger.error(f"Error processing user {user}: {e}")
+                USER_FETCHES.inc(result="error")
+            return None, since_id
+
+    results = await asyncio.gather(*(fetch(user) for user in usernames))
+    return {
+        user: result
+        for user, result in zip(usernames, results)
+        if result[0] is not None
+    }
+
+def _fetch_user_events(client, user, limit, since_id=None):
+    """
+    Fetch and filter one user's events newer than since_id.
+    Returns (activities, latest event id); errors are logged and yield (None, since_id).
+    """
+    if _rate_limited(client, user):
+        return None, since_id
+
+    try:
+        events = client.get_json(f"/users/{user}/events/public")
+        USER_FETCHES.inc(result="ok")
+        return _filter_events(user, events, limit, since_id)
+    except requests.exceptions.HTTPError as e:
+        logger.warning(f"Could not fetch events for {user}: {e.response.status_code}")
+        USER_FETCHES.inc(result="http_error")
+    except Exception as e:
+        logger.error(f"Error processing user {user}: {e}")
+        USER_FETCHES.inc(result="error")
+    return None, since_id
+
+def _rate_limited(client, user):
+    remaining, reset = client.rate_limit("core")
+    if remaining is not None and remaining <= RATE_LIMIT_RESERVE:
+        reset_at = datetime.fromtimestamp(reset).strftime('%H:%M:%S') if reset else "unknown"
+        logger.warning(f"Skipping {user}: only {remaining} GitHub requests left until {reset_at}")
+        USER_FETCHES.inc(result="rate_limited")
+        return True
+    return False
+
+def _filter_events(user, events, limit, since_id):
+    """Keep interesting events newer than since_id; returns (activities, latest event id)."""
+    # Events come newest first; everything at or below the cursor was seen already
+    if since_id is not None:
+        events = [event for event in events if int(event.get('id', 0)) > int(since_id)]
+    latest_id = events[0].get('id') if events else since_id
+    
+    # Filter for interesting events: WatchEvent (Star), CreateEvent (New Repo)
+    user_events = []
+    for event in events[:limit*2]: # Fetch a bit more to filter
+        event_type = event.get('type')
+        repo_name = event.get('repo', {}).get('name')
+        created_at = event.get('created_at')
+        
+        if event_type == 'WatchEvent':
+            user_events.append({
+                'user': user,
+                'type': 'star',
+                'repo_name': repo_name,
+                'repo_url': f"https://github.com/{repo_name}",
+                'time': created_at,
+                'description': f"starred {repo_name}"
+            })
+        elif event_type == 'CreateEvent' and event.get('payload', {}).get('ref_type') == 'repository':
+            user_events.append({
+                'user': user,
+                'type': 'create',
+                'repo_name': repo_name,
+                'repo_url': f"https://github.com/{repo_name}",
+                'time': created_at,
+                'description': f"created new repo {repo_name}"
+            })
+        
+        if len(user_events) >= limit:
+            break
+    
+    return user_events, latest_id
@@ -1,43 +1,192 @@
 import json
 import os
-from flask import Flask, render_template, jsonify, request
+import time
+from flask import Flask, Response, g, render_template, jsonify, request, stream_with_context
 from cache_manager import TrendingCache
-from user_tracker import get_user_activities
+from search_cache import SearchCache
+from github_client import get_client
+from repo_record import RepoRecord, json_default
+from prerender import PrerenderCache, Rendered, negotiate
 from datetime import datetime
+import metrics
 
 app = Flask(__name__)
+# jsonify cannot encode RepoRecords on its own
+_flask_json_default = app.json.default
+app.json.default = lambda obj: obj.to_dict() if isinstance(obj, RepoRecord) else _flask_json_default(obj)
 cache_manager = TrendingCache(ttl_seconds=3600, cache_file="data/cache.json")
+# Repeated searches skip both the LLM expansion and the GitHub request
+search_cache = SearchCache()
+# Dashboard and trending bodies are rendered and compressed once per cache update
+prerendered = PrerenderCache()
 
-# Load recommended gurus
+HTTP_REQUESTS = metrics.counter("http_requests_total", "Dashboard HTTP requests by route, method and status", ["endpoint", "method", "status"])
+HTTP_SECONDS = metrics.histogram("http_request_duration_seconds", "Time until the response (or the start of a stream) was ready", ["endpoint", "method"])
+
+# Map common language codes to full names for LLM
+LANGUAGE_NAMES = {
+    'zh-CN': 'Chinese',
+    'en': 'English',
+    'ja': 'Japanese',
+    'es': 'Spanish',
+    'ko': 'Korean',
+    'fr': 'French',
+    'de': 'German'
+}
+
+GURUS_PATH = os.path.join(os.path.dirname(__file__), 'data', 'gurus.json')
+_gurus_cache = (None, {})
+
+def gurus_mtime():
+    try:
+        return os.path.getmtime(GURUS_PATH)
+    except OSError:
+        return None
+
+# Load recommended gurus (re-read only when the file changes)
 def load_gurus():
-    gurus_path = os.path.join(os.path.dirname(__file__), 'data', 'gurus.json')
-    if os.path.exists(gurus_path):
-        with open(gurus_path, 'r') as f:
-            return json.load(f)
-    return {}
+    global _gurus_cache
+    mtime = gurus_mtime()
+    if mtime is None:
+        return {}
+    if _gurus_cache[0] != mtime:
+        with open(GURUS_PATH, 'r') as f:
+            _gurus_cache = (mtime, json.load(f))
+    return _gurus_cache[1]
+
+def write_token(token):
+    """Persist GITHUB_TOKEN to .env (empty token clears it) and update the current process env."""
+    env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
+    
+    # Read existing lines
+    lines = []
+    if os.path.exists(env_path):
+        with open(env_path, 'r') as f:
+            lines = f.readlines()
+    
+    # Remove existing GITHUB_TOKEN line
+    lines = [line for line in lines if not line.startswith('GITHUB_TOKEN=')]
+    
+    # Append new token
+    if token:
+        if lines and not lines[-1].endswith('\n'):
+            lines.append('\n')
+        lines.append(f'GITHUB_TOKEN={token}\n')
+        
+    with open(env_path, 'w') as f:
+        f.writelines(lines)
+        
+    # Update current process env
+    if token:
+        os.environ['GITHUB_TOKEN'] = token
+    elif 'GITHUB_TOKEN' in os.environ:
+        del os.environ['GITHUB_TOKEN']
+
+# X-Accel-Buffering stops nginx-style proxies from holding a stream back
+STREAM_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+def sse_events(chunks):
+    """Server-Sent Events for a generator of text chunks: one {"delta"} per chunk, then a 'done' event with {"text"}."""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield sse_delta(chunk)
+    yield sse_done(parts)
+
+def sse_delta(chunk):
+    return f"data: {json.dumps({'delta': chunk}, ensure_ascii=False)}\n\n"
+
+def sse_done(parts):
+    return f"event: done\ndata: {json.dumps({'text': ''.join(parts).strip()}, ensure_ascii=False)}\n\n"
+
+def sse_response(chunks):
+    """Wrap a generator of text chunks as a Server-Sent Events stream ending with a 'done' event."""
+    return Response(stream_with_context(sse_events(chunks)), mimetype='text/event-stream', headers=STREAM_HEADERS)
+
+def hidden_gems_lines(limit=6):
+    """
+    NDJSON lines of cache_manager.stream_hidden_gems(): {"type": "gems", "gems": [...]} as soon as GitHub answers,
+    then {"type": "analysis", "index", "gem_analysis"} per gem as its analysis finishes, then {"type": "done"}.
+    """
+    for event in cache_manager.stream_hidden_gems(limit=limit):
+        if event[0] == 'gems':
+            line = {"type": "gems", "gems": event[1]}
+        else:
+            line = {"type": "analysis", "index": event[1], "gem_analysis": event[2]}
+        yield json.dumps(line, ensure_ascii=False, default=json_default) + "\n"
+    yield json.dumps({"type": "done"}) + "\n"
+
+def analyze_stream_chunks(data):
+    """Text chunks for /api/analyze/stream: mode 'repo' (default) streams analyze_repo, 'potential' the hidden-gem analysis."""
+    description = data.get('description') or ''
+    language = data.get('language') or 'Unknown'
+    analyzer = cache_manager.llm_analyzer
+    if data.get('mode') == 'potential':
+        return analyzer.analyze_potential_stream(data['name'], description, language)
+    return analyzer.analyze_repo_stream(data['name'], description, language)
+
+def record_http(rule, method, status, started):
+    # Label by route pattern so unknown URLs cannot blow up the label set
+    endpoint = rule.rule if rule else "unmatched"
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=method, status=status)
+    HTTP_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint, method=method)
+
+def dashboard_version():
+    """Everything the rendered dashboard depends on; a new value means a new rendering."""
+    return (datetime.now().strftime('%Y-%m-%d'), cache_manager.data_version('daily_', 'vip_activities'),
+            tuple(cache_manager.watchlist), gurus_mtime())
+
+def trending_version(since):
+    return cache_manager.data_version(f"{since}_")
+
+def dashboard_context(trending_data, vip_data):
+    updated_at = cache_manager.updated_at('daily_')
+    # The time the data was fetched, not the time of rendering
+    last_updated = datetime.fromtimestamp(updated_at) if updated_at else datetime.now()
+    return dict(trending_repos=trending_data,
+                vip_activities=vip_data,
+                date=datetime.now().strftime('%Y-%m-%d'),
+                last_updated=last_updated.strftime('%Y-%m-%d %H:%M:%S'),
+                gurus=load_gurus(),
+                watchlist=cache_manager.watchlist,
+                current_period='daily')
+
+def rendered_entry(name, version, current_version, body):
+    """
+    Keep body for later requests only if the inputs did not change while it was built
+    (version is taken before reading the data, current_version after).
+    """
+    if version == current_version:
+        return prerendered.store(name, version, body)
+    return Rendered(version, body.encode('utf-8') if isinstance(body, str) else body)
+
+def prerendered_response(entry, mimetype):
+    status, body, headers = negotiate(entry, request.headers.get('If-None-Match'), request.headers.get('Accept-Encoding'))
+    return Response(body, status=status, headers=headers, mimetype=mimetype)
+
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    if 'started' in g:
+        record_http(request.url_rule, request.method, response.status_code, g.started)
+    return response
 
 @app.route('/')
 def dashboard():
-    # Fetch data from cache (assuming service.py has populated it)
+    version = dashboard_version()
+    # Fetch data from cache (assuming service.py has populated it); this also refreshes expired entries
     # Default to daily
     trending_data = cache_manager.get_data(since='daily')
     vip_data = cache_manager.get_vip_activities()
-    
-    # Get current watchlist to mark gurus as followed
-    watchlist = cache_manager.watchlist
-    gurus = load_gurus()
-    
-    date_str = datetime.now().strftime('%Y-%m-%d')
-    last_updated = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    
-    return render_template('index.html', 
-                           trending_repos=trending_data, 
-                           vip_activities=vip_data,
-                           date=date_str,
-                           last_updated=last_updated,
-                           gurus=gurus,
-                           watchlist=watchlist,
-                           current_period='daily')
+
+    entry = prerendered.lookup('dashboard', version)
+    if entry is None:
+        body = render_template('index.html', **dashboard_context(trending_data, vip_data))
+        entry = rendered_entry('dashboard', version, dashboard_version(), body)
+    return prerendered_response(entry, 'text/html')
 
 @app.route('/api/trending')
 def get_trending():
@@ -45,10 +194,16 @@ def get_trending():
     if since not in ['daily', 'weekly', 'monthly']:
         since = 'daily'
         
+    version = trending_version(since)
     # Force refresh if user explicitly asks? Maybe not for now to be fast.
     # But if data is missing, get_data will fetch it.
     trending_data = cache_manager.get_data(since=since)
-    return jsonify(trending_data)
+
+    name = f"trending_{since}"
+    entry = prerendered.lookup(name, version)
+    if entry is None:
+        entry = rendered_entry(name, version, trending_version(since), app.json.dumps(trending_data))
+    return prerendered_response(entry, 'application/json')
 
 @app.route('/api/follow', methods=['POST'])
 def follow_user():
@@ -64,23 +219,9 @@ def follow_user():
         watchlist.append(username)
         cache_manager.save_watchlist(watchlist)
         
-        # 2. Immediately fetch data for this new user
+        # 2. Immediately fetch data for this new user and merge it into the feed
         try:
-            new_activities = get_user_activities([username])
-            
-            # 3. Merge with existing cache
-            current_activities = cache_manager.get_vip_activities() or []
-            # Filter out any existing activities for this user (just in case) to avoid dupes
-            current_activities = [act for act in current_activities if act['user'] != username]
-            
-            updated_activities = current_activities + new_activities
-            # Sort by time descending
-            updated_activities.sort(key=lambda x: x['time'], reverse=True)
-            
-            # 4. Update Cache directly
-            cache_manager._cache['vip_activities'] = updated_activities
-            cache_manager._save_cache()
-            
+            cache_manager.follow_user(username)
         except Exception as e:
             print(f"Error fetching new user data: {e}")
             
@@ -103,34 +244,26 @@ def unfollow_user():
         cache_manager.save_watchlist(watchlist)
         
         # 2. Remove their activities from cache
-        current_activities = cache_manager.get_vip_activities() or []
-        updated_activities = [act for act in current_activities if act['user'] != username]
-        
-        cache_manager._cache['vip_activities'] = updated_activities
-        cache_manager._save_cache()
+        cache_manager.unfollow_user(username)
         
         return jsonify({"status": "success", "message": f"Unfollowed {username}", "watchlist": watchlist})
     
     return jsonify({"status": "info", "message": f"Not following {username}"})
 
-from scraper import search_repos, search_hidden_gems
+from scraper import search_repos
 
 @app.route('/api/hidden-gems')
 def get_hidden_gems():
-    # 1. Fetch raw gems
-    gems = search_hidden_gems(limit=6) # 6 is a good number for grid
-    
-    # 2. Analyze with LLM to find "Why it is a gem"
-    for gem in gems:
-        # Simple analysis
-        gem['gem_analysis'] = cache_manager.llm_analyzer.analyze_potential(
-            gem['name'], 
-            gem['description'] or '', 
-            gem['language'] or 'Unknown'
-        )
-        
+    # Gems and their "why it is a gem" analysis are cached and kept warm by service.py
+    gems = cache_manager.get_hidden_gems(limit=6) # 6 is a good number for grid
     return jsonify(gems)
 
+@app.route('/api/hidden-gems/stream')
+def stream_hidden_gems():
+    """NDJSON stream of the hidden gems, see hidden_gems_lines()."""
+    return Response(stream_with_context(hidden_gems_lines(limit=6)), mimetype='application/x-ndjson',
+                    headers=STREAM_HEADERS)
+
 @app.route('/api/search', methods=['POST'])
 def search():
     data = request.json
@@ -140,10 +273,13 @@ def search():
         return jsonify({"error": "Query required"}), 400
         
     # 1. Expand query using LLM (Cross-language support)
-    expanded_query = cache_manager.llm_analyzer.expand_search_query(query)
-    
     # 2. Search GitHub
-    repos = search_repos(expanded_query)
+    # Both steps are served from search_cache when the query was seen recently
+    expanded_query, repos = search_cache.search(
+        query,
+        expand=lambda q: cache_manager.llm_analyzer.expand_search_query(q, raise_errors=True),
+        search=search_repos
+    )
     
     # 3. Analyze repos with LLM (Optional, maybe for top 3 to be fast?)
     # For now, let's just return raw results to be fast, 
@@ -163,22 +299,38 @@ def translate_text():
     if not text:
         return jsonify({"error": "Text required"}), 400
         
-    # Map common language codes to full names for LLM
-    lang_map = {
-        'zh-CN': 'Chinese',
-        'en': 'English',
-        'ja': 'Japanese',
-        'es': 'Spanish',
-        'ko': 'Korean',
-        'fr': 'French',
-        'de': 'German'
-    }
-    
-    target_lang_name = lang_map.get(target_language, target_language)
+    target_lang_name = LANGUAGE_NAMES.get(target_language, target_language)
     
     translated_text = cache_manager.llm_analyzer.translate(text, target_lang_name)
     return jsonify({"translated_text": translated_text})
 
+@app.route('/api/translate/stream', methods=['POST'])
+def translate_text_stream():
+    """Streaming /api/translate: SSE 'data' events carry {"delta"}, the final 'done' event {"text"}."""
+    data = request.json
+    text = data.get('text')
+    target_language = data.get('target_language', 'zh-CN')
+    
+    if not text:
+        return jsonify({"error": "Text required"}), 400
+    
+    target_lang_name = LANGUAGE_NAMES.get(target_language, target_language)
+    return sse_response(cache_manager.llm_analyzer.translate_stream(text, target_lang_name))
+
+@app.route('/api/analyze/stream', methods=['POST'])
+def analyze_stream():
+    """
+    Stream an AI analysis over SSE.
+    mode 'repo' (default) streams analyze_repo, 'potential' streams the hidden-gem analysis.
+    """
+    data = request.json
+    name = data.get('name')
+    
+    if not name:
+        return jsonify({"error": "Name required"}), 400
+    
+    return sse_response(analyze_stream_chunks(data))
+
 @app.route('/api/settings/token', methods=['POST'])
 def save_token():
     data = request.json
@@ -188,33 +340,8 @@ def save_token():
         # Clear token if empty string provided
         token = ""
         
-    env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env')
-    
     try:
-        # Read existing lines
-        lines = []
-        if os.path.exists(env_path):
-            with open(env_path, 'r') as f:
-                lines = f.readlines()
-        
-        # Remove existing GITHUB_TOKEN line
-        lines = [line for line in lines if not line.startswith('GITHUB_TOKEN=')]
-        
-        # Append new token
-        if token:
-            if lines and not lines[-1].endswith('\n'):
-                lines.append('\n')
-            lines.append(f'GITHUB_TOKEN={token}\n')
-            
-        with open(env_path, 'w') as f:
-            f.writelines(lines)
-            
-        # Update current process env
-        if token:
-            os.environ['GITHUB_TOKEN'] = token
-        elif 'GITHUB_TOKEN' in os.environ:
-            del os.environ['GITHUB_TOKEN']
-            
+        write_token(token)
         return jsonify({"status": "success", "message": "Token saved successfully"})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
@@ -227,6 +354,25 @@ def get_token_status():
         "masked_token": f"{token[:4]}...{token[-4:]}" if token and len(token) > 8 else None
     })
 
+def llm_metrics():
+    """LLM call accounting plus the LLM result cache, for /api/metrics."""
+    analyzer = cache_manager.llm_analyzer
+    return {
+        "model": analyzer.model,
+        "router": analyzer.router.stats() if analyzer.router else None,
+        "calls": analyzer.metrics.snapshot(),
+        "cache": analyzer.cache.stats()
+    }
+
+@app.route('/api/metrics')
+def get_metrics():
+    return jsonify({"llm": llm_metrics(), "search_cache": search_cache.stats(), "trending_cache": cache_manager.stale_stats(),
+                    "github": get_client().stats()})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=metrics.CONTENT_TYPE)
+
 if __name__ == '__main__':
     print("Starting Web Server on http://localhost:5001")
     app.run(host='0.0.0.0', port=5001, debug=True)
@@ -0,0 +1,93 @@
+import time
+import threading
+
+from cache_manager import TrendingCache
+
+THREADS = 16
+
+def make_cache(tmp_path, monkeypatch, **kwargs):
+    monkeypatch.setenv("LLM_CACHE_PATH", str(tmp_path / "llm_cache.db"))
+    monkeypatch.setenv("LLM_METRICS_LOG", str(tmp_path / "llm_metrics.log"))
+    return TrendingCache(ttl_seconds=60, cache_file=str(tmp_path / "cache.json"), **kwargs)
+
+def hammer(cache, key, fetch_func, release):
+    """Call _get_cached_or_fetch from THREADS threads at once; release lets the fetch finish."""
+    results = [None] * THREADS
+    start = threading.Barrier(THREADS)
+
+    def worker(index):
+        start.wait()
+        results[index] = cache._get_cached_or_fetch(key, fetch_func, force_refresh=False)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(THREADS)]
+    for thread in threads:
+        thread.start()
+    # Keep the fetch open until every caller has had time to find it in flight
+    time.sleep(0.3)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results
+
+def counting_fetch(release):
+    calls = []
+    lock = threading.Lock()
+
+    def fetch():
+        with lock:
+            calls.append(1)
+        release.wait(timeout=10)
+        return [{"full_name": "octo/fresh"}]
+
+    return fetch, calls
+
+def test_expired_key_is_fetched_once_for_concurrent_callers(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, monkeypatch, stale_while_revalidate=False)
+    cache._set_entry("hidden_gems_3", [{"full_name": "octo/old"}], updated_at=time.time() - 3600)
+    release = threading.Event()
+    fetch, calls = counting_fetch(release)
+
+    results = hammer(cache, "hidden_gems_3", fetch, release)
+
+    assert len(calls) == 1
+    assert results[0] == [{"full_name": "octo/fresh"}]
+    assert all(result is results[0] for result in results)
+    assert cache._inflight == {}
+
+def test_stale_key_is_revalidated_once_in_background(tmp_path, monkeypatch):
+    cache = make_cache(tmp_path, monkeypatch, hard_ttl_seconds=86400)
+    old = [{"full_name": "octo/old"}]
+    cache._set_entry("hidden_gems_3", old, updated_at=time.time() - 3600)
+    release = threading.Event()
+    fetch, calls = counting_fetch(release)
+
+    results = hammer(cache, "hidden_gems_3", fetch, release)
+
+    # Everyone is answered from the stale entry while one refresh runs
+    assert all(result is old for result in results)
+    deadline = time.time() + 10
+    while cache._inflight and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(calls) == 1
+    assert cache._get_entry("hidden_gems_3")[0] == [{"full_name": "octo/fresh"}]
+
+def test_trending_lists_written_by_two_processes_stay_resolvable(tmp_path, monkeypatch):
+    import cache_manager
+    trending = {}
+    monkeypatch.setattr(cache_manager, "get_trending_repos", lambda since, language, limit: list(trending[since]))
+    worker = make_cache(tmp_path, monkeypatch)
+    worker.llm_analyzer.analyze_repos = lambda repos: repos
+
+    trending["monthly"] = [{"full_name": "octo/first"}]
+    worker.refresh_trending([("monthly", "")])
+    # The web process starts with the worker's first table in memory
+    web = make_cache(tmp_path, monkeypatch)
+    web.llm_analyzer.analyze_repos = lambda repos: repos
+    trending["monthly"] = [{"full_name": "octo/second"}]
+    worker.refresh_trending([("monthly", "")])
+
+    trending["daily"] = [{"full_name": "octo/daily"}]
+    assert web.get_data("daily", force_refresh=True) == [{"full_name": "octo/daily"}]
+
+    reader = make_cache(tmp_path, monkeypatch)
+    assert reader.get_data("monthly") == [{"full_name": "octo/second"}]
@@ -0,0 +1,116 @@
+import json
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from github_client import GitHubClient
+
+ETAG = '"v1"'
+
+class StubGitHub(BaseHTTPRequestHandler):
+    """
+    Answers /flaky with 502 once, then 200; /repos with an ETag and 304 when it matches;
+    /drop closes the connection without a response once and /garbled sends a truncated body once.
+    """
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        path = self.path.split('?')[0]
+        server.requests.append((path, self.headers.get("If-None-Match")))
+        if path == "/flaky":
+            server.flaky_calls += 1
+            if server.flaky_calls == 1:
+                return self._send(502, {"message": "Bad Gateway"})
+            return self._send(200, {"ok": True})
+        if path in ("/drop", "/garbled"):
+            server.flaky_calls += 1
+            if server.flaky_calls == 1 and path == "/drop":
+                self.close_connection = True
+                return
+            if server.flaky_calls == 1:
+                return self._send_raw(200, b'{"ok": tr')
+            return self._send(200, {"ok": True})
+        if path == "/repos":
+            if self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.send_header("ETag", ETAG)
+                self.end_headers()
+                return
+            return self._send(200, {"items": [{"full_name": "octo/repo"}]}, {"ETag": ETAG})
+        self._send(404, {"message": "Not Found"})
+
+    def _send(self, status, body, headers=None):
+        self._send_raw(status, json.dumps(body).encode(), headers)
+
+    def _send_raw(self, status, payload, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubGitHub)
+    server.requests = []
+    server.flaky_calls = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def client(stub_server, monkeypatch):
+    monkeypatch.setattr("github_client.get_token", lambda: None)
+    return GitHubClient(base_url=f"http://127.0.0.1:{stub_server.server_address[1]}", timeout=5, max_retries=2, backoff=0)
+
+def test_5xx_is_retried(client, stub_server):
+    assert client.get_json("/flaky") == {"ok": True}
+    assert stub_server.flaky_calls == 2
+
+def test_304_serves_stored_body(client, stub_server):
+    first = client.get_json("/repos")
+    first["items"][0]["ai_analysis"] = "annotated by the caller"
+
+    second = client.get_json("/repos")
+
+    assert stub_server.requests == [("/repos", None), ("/repos", ETAG)]
+    # A fresh copy of the stored body, untouched by the caller's annotations
+    assert second == {"items": [{"full_name": "octo/repo"}]}
+    assert client.stats()["/repos"] == {"requests": 2, "not_modified": 1}
+
+def test_async_path_shares_conditional_store(client, stub_server):
+    client.get_json("/repos")
+
+    async def fetch():
+        try:
+            return await client.get_json_async("/repos")
+        finally:
+            await client._async_client.aclose()
+
+    assert asyncio.run(fetch()) == {"items": [{"full_name": "octo/repo"}]}
+    assert stub_server.requests[-1] == ("/repos", ETAG)
+    assert client.stats()["/repos"]["not_modified"] == 1
+
+@pytest.mark.parametrize("path", ["/drop", "/garbled"])
+def test_async_path_retries_dropped_and_garbled_responses(client, stub_server, path):
+    async def fetch():
+        try:
+            return await client.get_json_async(path)
+        finally:
+            await client._async_client.aclose()
+
+    assert asyncio.run(fetch()) == {"ok": True}
+    assert stub_server.flaky_calls == 2
+
+@pytest.mark.parametrize("path", ["/drop", "/garbled"])
+def test_sync_path_retries_dropped_and_garbled_responses(client, stub_server, path):
+    assert client.get_json(path) == {"ok": True}
+    assert stub_server.flaky_calls == 2
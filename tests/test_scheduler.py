@@ -0,0 +1,17 @@
+import scheduler as scheduler_module
+from scheduler import Scheduler
+
+def test_jitter_does_not_accumulate(tmp_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(scheduler_module.time, "time", lambda: clock[0])
+    # Always the maximum jitter, the worst case for drift
+    monkeypatch.setattr(scheduler_module.random, "uniform", lambda low, high: high)
+    scheduler = Scheduler(state_file=str(tmp_path / "state.json"))
+    job = scheduler.add_job("job", lambda: None, interval=3600, jitter=60)
+
+    for _ in range(100):
+        clock[0] = max(clock[0], job.next_run)
+        scheduler._run(job)
+
+    # First run at 1000, then on the hourly grid plus at most one jitter
+    assert job.next_run == 1000.0 + 100 * 3600 + 60